@@ -0,0 +1,114 @@
+"""
+Compare inventory read latency between the survivor_items and compact layouts.
+
+Usage: python -m api.benchmarks.inventory_layout --survivors 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import api.database as database
+from api.database import Base, ItemModel, ItemType, SurvivorModel, survivor_items
+from api.service.inventory.inventory_service import (
+    get_inventories,
+    get_survivor_inventory,
+    migrate_to_compact_inventories,
+)
+from api.service.inventory.item_catalog import invalidate_item_catalog
+
+
+async def seed(session: AsyncSession, survivors: int) -> None:
+    session.add_all(
+        ItemModel(name=item_type, points=item_type.points) for item_type in ItemType
+    )
+    await session.flush()
+    await session.execute(
+        insert(SurvivorModel),
+        [
+            {
+                "id": i,
+                "name": f"survivor-{i}",
+                "name_lower": f"survivor-{i}",
+                "age": 30,
+                "gender": "other",
+                "latitude": 0.0,
+                "longitude": 0.0,
+                "infected": False,
+            }
+            for i in range(1, survivors + 1)
+        ],
+    )
+    await session.execute(
+        insert(survivor_items),
+        [
+            {"survivor_id": i, "item_id": item_id, "quantity": random.randint(0, 20)}
+            for i in range(1, survivors + 1)
+            for item_id in range(1, len(ItemType) + 1)
+        ],
+    )
+    await session.commit()
+
+
+async def measure(session: AsyncSession, survivors: int, rounds: int) -> dict:
+    single, page = [], []
+    for _ in range(rounds):
+        survivor_id = random.randint(1, survivors)
+        start = time.perf_counter()
+        await get_survivor_inventory(survivor_id, session)
+        single.append(time.perf_counter() - start)
+
+        first = random.randint(1, max(1, survivors - 100))
+        start = time.perf_counter()
+        await get_inventories(range(first, first + 100), session)
+        page.append(time.perf_counter() - start)
+
+    return {
+        "single_ms": statistics.median(single) * 1000,
+        "page_of_100_ms": statistics.median(page) * 1000,
+    }
+
+
+async def main(survivors: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        invalidate_item_catalog()
+
+        async with session_factory() as session:
+            await seed(session, survivors)
+
+            database.INVENTORY_LAYOUT = "items"
+            items_layout = await measure(session, survivors, rounds)
+
+            database.INVENTORY_LAYOUT = "compact"
+            await migrate_to_compact_inventories(session)
+            await session.commit()
+            compact_layout = await measure(session, survivors, rounds)
+
+        await engine.dispose()
+
+    print(f"{'layout':<10}{'single (ms)':>14}{'page of 100 (ms)':>20}")
+    for name, result in (("items", items_layout), ("compact", compact_layout)):
+        print(
+            f"{name:<10}{result['single_ms']:>14.3f}{result['page_of_100_ms']:>20.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--survivors", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.survivors, args.rounds))
@@ -0,0 +1,461 @@
+"""
+Drive every API route against a seeded scratch database and report latency.
+
+Each scenario issues --requests requests at --concurrency through an
+in-process ASGI client (or a real uvicorn with --uvicorn) and reports
+p50/p95/p99 latency, requests per second and SQL statements per request.
+Results can be saved as a baseline and later runs compared against it.
+The change feed is left out since its responses never complete. Offers are
+cancelled newest first; cancelling one that was already filled counts as a
+4xx.
+
+Usage: python -m api.benchmarks.run --survivors 20000 --concurrency 16
+       python -m api.benchmarks.run --baseline bench.json --update-baseline
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+import api.database as database
+from api.main import app
+from api.models import InfectionReport, SurvivorCreate
+from api.profiling import instrument_engine
+from api.service.infection.infection_service import report_infections_batch
+from api.service.survivors.survivor_service import create_survivors_batch
+
+SEED_CHUNK_SIZE = 5000
+SEED_INVENTORY = {"water": 20, "food": 20, "medication": 20, "ammunition": 80}
+
+# name -> (method, path, json body); each factory receives a random.Random.
+Scenario = Callable[[random.Random], Tuple[str, str, Optional[object]]]
+
+
+def build_scenarios(survivors: int) -> Dict[str, Scenario]:
+    names = itertools.count()
+    # Offer ids follow posting order on the scratch database.
+    offers_posted = 0
+
+    def survivor_id(rng: random.Random) -> int:
+        return rng.randint(1, survivors)
+
+    def new_survivor(rng: random.Random) -> dict:
+        return {
+            "name": f"bench-{os.getpid()}-{next(names)}",
+            "age": rng.randint(1, 90),
+            "gender": rng.choice(["male", "female", "other"]),
+            "latitude": rng.uniform(-60, 60),
+            "longitude": rng.uniform(-180, 180),
+            "inventory": SEED_INVENTORY,
+        }
+
+    def location(rng: random.Random) -> dict:
+        return {"latitude": rng.uniform(-60, 60), "longitude": rng.uniform(-180, 180)}
+
+    def trade(rng: random.Random) -> dict:
+        first, second = rng.sample(range(1, survivors + 1), 2)
+        return {
+            "trader1": {"survivor_id": first, "items": {"water": 1}},
+            "trader2": {"survivor_id": second, "items": {"ammunition": 4}},
+        }
+
+    def offer(rng: random.Random) -> dict:
+        nonlocal offers_posted
+        offers_posted += 1
+        # Mostly resting offers, with a quarter crossing them.
+        sides = [("water", 1), ("ammunition", 4)]
+        if rng.random() < 0.25:
+            sides.reverse()
+        (give, give_quantity), (want, want_quantity) = sides
+        return {
+            "survivor_id": survivor_id(rng),
+            "give_item": give,
+            "give_quantity": give_quantity,
+            "want_item": want,
+            "want_quantity": want_quantity,
+        }
+
+    def cancel(rng: random.Random) -> Tuple[str, str, None]:
+        # Newest first: the oldest offers are the first to be filled.
+        nonlocal offers_posted
+        offers_posted -= 1
+        return "DELETE", f"/api/offers/{offers_posted + 1}", None
+
+    def report(rng: random.Random) -> dict:
+        reporter, reported = rng.sample(range(1, survivors + 1), 2)
+        return {"reporter_id": reporter, "reported_id": reported}
+
+    return {
+        "GET /api": lambda rng: ("GET", "/api", None),
+        "GET /api/survivors": lambda rng: ("GET", "/api/survivors?limit=100", None),
+        "GET /api/survivors/{id}": lambda rng: (
+            "GET", f"/api/survivors/{survivor_id(rng)}", None
+        ),
+        "GET /api/survivors/name/{name}": lambda rng: (
+            "GET", f"/api/survivors/name/survivor-{survivor_id(rng)}", None
+        ),
+        "GET /api/survivors/nearby": lambda rng: (
+            "GET",
+            "/api/survivors/nearby?lat={:.4f}&lon={:.4f}&radius_km=50".format(
+                rng.uniform(-60, 60), rng.uniform(-180, 180)
+            ),
+            None,
+        ),
+        "GET /api/survivors/export": lambda rng: (
+            "GET",
+            "/api/survivors/export?min_latitude={0:.2f}&max_latitude={1:.2f}".format(
+                *sorted((rng.uniform(-60, 60), rng.uniform(-60, 60)))
+            ),
+            None,
+        ),
+        "GET /api/reports/infected": lambda rng: ("GET", "/api/reports/infected", None),
+        "GET /api/reports/non-infected": lambda rng: (
+            "GET", "/api/reports/non-infected", None
+        ),
+        "GET /api/reports/resources": lambda rng: (
+            "GET", "/api/reports/resources", None
+        ),
+        "GET /api/reports/points-lost": lambda rng: (
+            "GET", "/api/reports/points-lost", None
+        ),
+        "GET /api/locations/metrics": lambda rng: (
+            "GET", "/api/locations/metrics", None
+        ),
+        "GET /api/graph/at-risk": lambda rng: ("GET", "/api/graph/at-risk", None),
+        "GET /api/graph/clusters": lambda rng: (
+            "GET", "/api/graph/clusters?min_size=2&limit=50", None
+        ),
+        "GET /api/graph/suspicious-reporters": lambda rng: (
+            "GET", "/api/graph/suspicious-reporters?min_reports=2", None
+        ),
+        "GET /metrics": lambda rng: ("GET", "/metrics", None),
+        "POST /api/survivors": lambda rng: (
+            "POST", "/api/survivors", new_survivor(rng)
+        ),
+        "POST /api/survivors/batch": lambda rng: (
+            "POST", "/api/survivors/batch", [new_survivor(rng) for _ in range(50)]
+        ),
+        "PUT /api/survivors/{id}/location": lambda rng: (
+            "PUT", f"/api/survivors/{survivor_id(rng)}/location", location(rng)
+        ),
+        "PUT /api/survivors/locations": lambda rng: (
+            "PUT",
+            "/api/survivors/locations",
+            [{"survivor_id": survivor_id(rng), **location(rng)} for _ in range(100)],
+        ),
+        "POST /api/trade": lambda rng: ("POST", "/api/trade", trade(rng)),
+        "POST /api/trades/batch": lambda rng: (
+            "POST", "/api/trades/batch?atomic=false", [trade(rng) for _ in range(20)]
+        ),
+        "POST /api/offers": lambda rng: ("POST", "/api/offers", offer(rng)),
+        "GET /api/offers": lambda rng: (
+            "GET", "/api/offers?give_item=water&limit=100", None
+        ),
+        "DELETE /api/offers/{id}": cancel,
+        # Reports run last: every infection they cause makes trades fail.
+        "POST /api/survivors/{id}/report": lambda rng: (
+            "POST",
+            f"/api/survivors/{survivor_id(rng)}/report",
+            {"reporter_id": survivor_id(rng)},
+        ),
+        "POST /api/reports/batch": lambda rng: (
+            "POST", "/api/reports/batch", [report(rng) for _ in range(50)]
+        ),
+    }
+
+
+async def seed(survivors: int, reports: int, rng: random.Random) -> None:
+    """Fill the scratch database through the regular write paths."""
+    async with database.AsyncSessionLocal() as session:
+        for start in range(1, survivors + 1, SEED_CHUNK_SIZE):
+            await create_survivors_batch(
+                [
+                    SurvivorCreate(
+                        name=f"survivor-{i}",
+                        age=rng.randint(1, 90),
+                        gender=rng.choice(["male", "female", "other"]),
+                        latitude=rng.uniform(-60, 60),
+                        longitude=rng.uniform(-180, 180),
+                        inventory=SEED_INVENTORY,
+                    )
+                    for i in range(start, min(start + SEED_CHUNK_SIZE, survivors + 1))
+                ],
+                session,
+            )
+
+        pairs = set()
+        while len(pairs) < min(reports, survivors * (survivors - 1)):
+            pairs.add(tuple(rng.sample(range(1, survivors + 1), 2)))
+        pairs = sorted(pairs)
+        for start in range(0, len(pairs), SEED_CHUNK_SIZE):
+            await report_infections_batch(
+                [
+                    InfectionReport(reporter_id=reporter, reported_id=reported)
+                    for reporter, reported in pairs[start:start + SEED_CHUNK_SIZE]
+                ],
+                session,
+            )
+
+
+class StatementCounter:
+    """Counts SQL statements executed on the primary and read engines."""
+
+    def __init__(self):
+        self.count = 0
+        engines = {database.engine.sync_engine, database.read_engine.sync_engine}
+        for sync_engine in engines:
+            event.listen(sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+def use_database(url: str) -> None:
+    """Point the app's engines and session factories at the scratch database."""
+    database.engine = database.create_engine_from_url(url)
+    database.read_engine = database.engine
+    if make_url(url).get_backend_name() == "sqlite":
+        database.read_engine = database.create_engine_from_url(url, read_only=True)
+    database.AsyncSessionLocal.configure(bind=database.engine)
+    database.AsyncReadSessionLocal.configure(bind=database.read_engine)
+    # api.main instrumented the engines these replace.
+    instrument_engine(database.engine)
+    instrument_engine(database.read_engine)
+
+
+def percentile(quantiles: List[float], p: int) -> float:
+    return quantiles[p - 1] * 1000 if quantiles else 0.0
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+    counter: Optional[StatementCounter],
+) -> dict:
+    latencies: List[float] = []
+    failures = 0
+    rejected = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal failures, rejected
+        for _ in remaining:
+            method, path, body = scenario(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                await response.aread()
+            except httpx.HTTPError:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                failures += 1
+            elif response.status_code >= 400:
+                rejected += 1
+
+    statements_before = counter.count if counter else 0
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "requests": requests,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "errors": failures,
+        "rejected": rejected,
+        "sql_per_request": (
+            (counter.count - statements_before) / requests if counter else None
+        ),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_uvicorn(workers: int) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "api.serve",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(300):
+            try:
+                await client.get("/api")
+                return process, base_url
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(args.survivors)
+    if args.routes:
+        scenarios = {
+            name: scenario
+            for name, scenario in scenarios.items()
+            if any(route in name for route in args.routes)
+        }
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        await seed(args.survivors, args.reports, rng)
+
+        if args.uvicorn:
+            process, base_url = await start_uvicorn(args.workers)
+            client = httpx.AsyncClient(base_url=base_url, timeout=60)
+            counter = None
+        else:
+            process = None
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://bench",
+                timeout=60,
+            )
+            counter = StatementCounter()
+
+        try:
+            for name, scenario in scenarios.items():
+                results[name] = await drive(
+                    client, scenario, args.requests, args.concurrency, rng, counter
+                )
+                print_row(name, results[name])
+        finally:
+            await client.aclose()
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    return {
+        "meta": {
+            "survivors": args.survivors,
+            "reports": args.reports,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "server": f"uvicorn x{args.workers}" if args.uvicorn else "asgi",
+            "python": platform.python_version(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "routes": results,
+    }
+
+
+def print_header() -> None:
+    print(
+        f"{'route':<36}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'sql/req':>9}{'4xx':>6}{'err':>5}"
+    )
+
+
+def print_row(name: str, result: dict) -> None:
+    sql = result["sql_per_request"]
+    print(
+        f"{name:<36}{result['rps']:>9.1f}{result['p50_ms']:>9.2f}"
+        f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+        f"{'-' if sql is None else format(sql, '.1f'):>9}"
+        f"{result['rejected']:>6}{result['errors']:>5}"
+    )
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """Print the relative change of p95 latency and throughput per route."""
+    print(f"\nCompared with baseline from {baseline['meta']['recorded_at']}:")
+    print(f"{'route':<36}{'p95':>10}{'rps':>10}{'sql/req':>10}")
+    for name, result in current["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            print(f"{name:<36}{'new':>10}")
+            continue
+
+        changes = [
+            f"{(result[key] - before[key]) / before[key]:+.1%}" if before[key] else "-"
+            for key in ("p95_ms", "rps")
+        ]
+        sql = "-"
+        if result["sql_per_request"] is not None and before["sql_per_request"]:
+            sql = f"{result['sql_per_request'] - before['sql_per_request']:+.1f}"
+        print(f"{name:<36}{changes[0]:>10}{changes[1]:>10}{sql:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--survivors", type=int, default=5000)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--routes", nargs="*", help="only run routes containing these strings"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--uvicorn", action="store_true", help="benchmark a real uvicorn server"
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results JSON file")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="overwrite --baseline with the results of this run",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or (
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        use_database(url)
+        # Picked up by the uvicorn subprocess.
+        os.environ["DATABASE_URL"] = url
+        print_header()
+        results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                compare(results, json.load(f))
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nBaseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure how requests/sec scale with the number of API worker processes.
+
+Seeds a scratch database once, then for every worker count starts
+``python -m api.serve --workers N`` and drives the read and trade routes
+from several client processes, so the load generator is not the bottleneck.
+
+Usage: python -m api.benchmarks.scaling --workers 1 2 4 --clients 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from api.benchmarks.run import (
+    build_scenarios,
+    drive,
+    seed,
+    start_uvicorn,
+    use_database,
+)
+from api.main import app
+
+ROUTES = ("GET /api/survivors/{id}", "POST /api/trade")
+
+
+def client(base_url: str, route: str, survivors: int, requests: int, args) -> dict:
+    """One load-generating process; returns its share of the results."""
+    scenario = build_scenarios(survivors)[route]
+    rng = random.Random(args["seed"])
+
+    async def go() -> dict:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+            return await drive(http, scenario, requests, args["concurrency"], rng, None)
+
+    return asyncio.run(go())
+
+
+async def measure(workers: int, args: argparse.Namespace) -> dict:
+    process, base_url = await start_uvicorn(workers)
+    results = {}
+    try:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(args.clients) as pool:
+            for route in ROUTES:
+                shares = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            pool,
+                            client,
+                            base_url,
+                            route,
+                            args.survivors,
+                            args.requests // args.clients,
+                            {"seed": args.seed + i, "concurrency": args.concurrency},
+                        )
+                        for i in range(args.clients)
+                    )
+                )
+                results[route] = {
+                    "rps": sum(share["rps"] for share in shares),
+                    "p95_ms": max(share["p95_ms"] for share in shares),
+                    "errors": sum(share["errors"] for share in shares),
+                    "rejected": sum(share["rejected"] for share in shares),
+                }
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with app.router.lifespan_context(app):
+        await seed(args.survivors, 0, random.Random(args.seed))
+
+    by_workers = {}
+    for workers in args.workers:
+        by_workers[workers] = await measure(workers, args)
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes")
+    print(f"{'workers':<9}" + "".join(f"{route:>28}" for route in ROUTES))
+    baseline = by_workers[args.workers[0]]
+    for workers, results in by_workers.items():
+        cells = []
+        for route in ROUTES:
+            rps, p95 = results[route]["rps"], results[route]["p95_ms"]
+            speedup = rps / baseline[route]["rps"] if baseline[route]["rps"] else 0
+            cells.append(f"{rps:>8.1f} rps x{speedup:.2f} p95 {p95:.0f}ms")
+        print(f"{workers:<9}" + "".join(f"{cell:>28}" for cell in cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--survivors", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or (
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        use_database(url)
+        # Picked up by the server subprocesses.
+        os.environ["DATABASE_URL"] = url
+        asyncio.run(main(args))
@@ -0,0 +1,126 @@
+"""
+Compare the CPU cost of serializing survivors through Pydantic models and
+through the row-to-JSON fast path, per 10k survivors.
+
+Usage: python -m api.benchmarks.serialization --survivors 50000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import api.serialization as serialization
+from api.benchmarks.inventory_layout import seed
+from api.database import Base, SurvivorModel
+from api.models import Survivor
+from api.service.inventory.item_catalog import invalidate_item_catalog
+from api.service.survivors.survivor_service import (
+    MAX_PAGE_SIZE,
+    build_survivors,
+    survivor_columns,
+    survivor_dicts,
+)
+
+
+def pydantic_page(survivors) -> bytes:
+    """The list route's encoding before the fast path."""
+    return b"[" + b",".join(s.model_dump_json().encode() for s in survivors) + b"]"
+
+
+async def cpu_per_10k(session: AsyncSession, survivors: int, encode) -> float:
+    """CPU seconds per 10k survivors to page through everyone with ``encode``."""
+    start = time.process_time()
+    last_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                survivor_columns()
+                .where(SurvivorModel.id > last_id)
+                .order_by(SurvivorModel.id)
+                .limit(MAX_PAGE_SIZE)
+            )
+        ).all()
+        if not rows:
+            break
+        await encode(rows, session)
+        last_id = rows[-1].id
+    return (time.process_time() - start) * 10000 / survivors
+
+
+async def via_models(rows, session: AsyncSession) -> bytes:
+    return pydantic_page(await build_survivors(rows, session))
+
+
+async def via_dicts(rows, session: AsyncSession) -> bytes:
+    return serialization.dumps_array(await survivor_dicts(rows, session))
+
+
+def encode_only(dicts, rounds: int) -> dict:
+    """Encoding cost alone, starting from already loaded survivor dicts."""
+    results = {}
+
+    start = time.process_time()
+    for _ in range(rounds):
+        pydantic_page([Survivor(**survivor) for survivor in dicts])
+    results["pydantic"] = time.process_time() - start
+
+    start = time.process_time()
+    for _ in range(rounds):
+        serialization.dumps_array(dicts)
+    results["fast path"] = time.process_time() - start
+
+    orjson, serialization.orjson = serialization.orjson, None
+    try:
+        start = time.process_time()
+        for _ in range(rounds):
+            serialization.dumps_array(dicts)
+        results["fast path (json)"] = time.process_time() - start
+    finally:
+        serialization.orjson = orjson
+
+    scale = 10000 / (len(dicts) * rounds)
+    return {name: seconds * scale for name, seconds in results.items()}
+
+
+async def main(survivors: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        invalidate_item_catalog()
+
+        async with session_factory() as session:
+            await seed(session, survivors)
+            end_to_end = {
+                "pydantic": await cpu_per_10k(session, survivors, via_models),
+                "fast path": await cpu_per_10k(session, survivors, via_dicts),
+            }
+            rows = (
+                await session.execute(survivor_columns().limit(MAX_PAGE_SIZE))
+            ).all()
+            encoding = encode_only(await survivor_dicts(rows, session), rounds)
+
+        await engine.dispose()
+
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"CPU ms per 10k survivors (fast path encoder: {backend})")
+    print(f"{'path':<20}{'paged from db':>16}{'encode only':>16}")
+    for name, seconds in encoding.items():
+        paged = end_to_end.get(name)
+        paged = f"{paged * 1000:>16.1f}" if paged is not None else f"{'-':>16}"
+        print(f"{name:<20}{paged}{seconds * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--survivors", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.survivors, args.rounds))
@@ -1,5 +1,8 @@
 import enum
-from typing import AsyncGenerator
+import os
+import time
+from pathlib import Path
+from typing import AsyncGenerator, Optional
 
 from sqlalchemy import (
     Boolean,
@@ -10,17 +13,110 @@ from sqlalchemy import (
     Integer,
     String,
     Table,
+    event,
+    inspect,
     select,
 )
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
 
 from .models import Gender
 
-DATABASE_URL = "sqlite+aiosqlite:///./zssn.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./zssn.db")
+# Optional replica for GET routes. Without one, SQLite reads get their own
+# read-only connection pool and other databases share the primary engine.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+# Requests arriving within this many seconds of the client's last write are
+# served from the primary so they observe that write.
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+LAST_WRITE_COOKIE = "zssn_last_write"
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# "items" keeps one survivor_items row per item type, "compact" keeps a single
+# inventories row per survivor.
+INVENTORY_LAYOUT = os.getenv("INVENTORY_LAYOUT", "items")
+INVENTORY_LAYOUT_KEY = "inventory_layout"
+
+ALEMBIC_INI = Path(__file__).parent / "alembic.ini"
+BASELINE_REVISION = "0001"
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _apply_sqlite_pragmas(
+    dbapi_connection, _connection_record, memory: bool, read_only: bool
+) -> None:
+    cursor = dbapi_connection.cursor()
+    if not memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_engine_from_url(
+    database_url: str, read_only: bool = False, **options
+) -> AsyncEngine:
+    """Build an engine with the configured pool and SQLite tuning applied."""
+    url = make_url(database_url)
+    memory = _is_memory_sqlite(url)
+
+    settings = {"echo": DB_ECHO, "pool_pre_ping": True}
+    if memory:
+        settings["poolclass"] = StaticPool
+    else:
+        settings.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    settings.update(options)
+
+    new_engine = create_async_engine(url, **settings)
+    if url.get_backend_name() == "sqlite":
+        event.listen(
+            new_engine.sync_engine,
+            "connect",
+            lambda conn, record: _apply_sqlite_pragmas(
+                conn, record, memory, read_only
+            ),
+        )
+    return new_engine
+
+
+def _create_read_engine(primary: AsyncEngine) -> AsyncEngine:
+    if READ_DATABASE_URL:
+        return create_engine_from_url(READ_DATABASE_URL, read_only=True)
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        # WAL lets these connections read while the primary pool writes.
+        return create_engine_from_url(DATABASE_URL, read_only=True)
+    return primary
+
+
+engine = create_engine_from_url(DATABASE_URL)
+read_engine = _create_read_engine(engine)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 Base = declarative_base()
 
 infection_reports = Table(
@@ -31,6 +127,9 @@ infection_reports = Table(
 )
 
 
+ITEM_POINTS = {"water": 4, "food": 3, "medication": 2, "ammunition": 1}
+
+
 class ItemType(str, enum.Enum):
     water = "water"
     food = "food"
@@ -39,8 +138,7 @@ class ItemType(str, enum.Enum):
 
     @property
     def points(self) -> int:
-        points_map = {"water": 4, "food": 3, "medication": 2, "ammunition": 1}
-        return points_map[self.value]
+        return ITEM_POINTS[self.value]
 
 
 survivor_items = Table(
@@ -52,6 +150,64 @@ survivor_items = Table(
 )
 
 
+inventories = Table(
+    "inventories",
+    Base.metadata,
+    Column("survivor_id", Integer, ForeignKey("survivors.id"), primary_key=True),
+    Column("water", Integer, nullable=False, default=0),
+    Column("food", Integer, nullable=False, default=0),
+    Column("medication", Integer, nullable=False, default=0),
+    Column("ammunition", Integer, nullable=False, default=0),
+)
+
+
+# Running totals per infection status, maintained by the write paths so the
+# /api/reports endpoints never have to scan survivors.
+population_stats = Table(
+    "population_stats",
+    Base.metadata,
+    Column("infected", Boolean, primary_key=True),
+    Column("survivors", Integer, nullable=False, default=0),
+    Column("water", Integer, nullable=False, default=0),
+    Column("food", Integer, nullable=False, default=0),
+    Column("medication", Integer, nullable=False, default=0),
+    Column("ammunition", Integer, nullable=False, default=0),
+)
+
+
+# Small key/value facts about the data itself, e.g. the inventory layout that
+# currently holds the inventories.
+app_metadata = Table(
+    "app_metadata",
+    Base.metadata,
+    Column("key", String, primary_key=True),
+    Column("value", String, nullable=False),
+)
+
+
+# Standing "give X for Y" offers. Quantities are whole exchange units of the
+# (give_item, want_item) pair, see api.service.offers.order_book.
+trade_offers = Table(
+    "trade_offers",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column(
+        "survivor_id", Integer, ForeignKey("survivors.id"), nullable=False, index=True
+    ),
+    Column("give_item", String, nullable=False),
+    Column("want_item", String, nullable=False),
+    # Exchange units still open, and as posted.
+    Column("units", Integer, nullable=False),
+    Column("posted_units", Integer, nullable=False, server_default="0"),
+    # "open", "filled" or "cancelled"; open offers are loaded on startup.
+    Column("status", String, nullable=False, default="open", index=True),
+)
+
+
+def uses_compact_inventory() -> bool:
+    return INVENTORY_LAYOUT == "compact"
+
+
 class ItemModel(Base):
     __tablename__ = "items"
 
@@ -68,11 +224,17 @@ class SurvivorModel(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
+    # lower(name), so case-insensitive lookups and uniqueness can use an index.
+    name_lower = Column(String, unique=True, index=True, nullable=False)
     age = Column(Integer)
     gender = Column(Enum(Gender))
     latitude = Column(Float)
     longitude = Column(Float)
+    geocell = Column(Integer, index=True)
     infected = Column(Boolean, default=False)
+    report_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every write that can invalidate a trade validated against it.
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     items = relationship(
         "ItemModel", secondary=survivor_items, back_populates="survivors"
     )
@@ -85,26 +247,74 @@ class SurvivorModel(Base):
     )
 
 
+def dialect_insert(db: AsyncSession):
+    """Return the dialect-specific ``insert`` that supports ON CONFLICT."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def run_migrations(connection) -> None:
+    """Upgrade the schema to the latest Alembic revision.
+
+    Databases created by ``create_all`` before migrations existed have no
+    ``alembic_version`` table; they are stamped with the baseline revision
+    first so only the later migrations run.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+
+    tables = inspect(connection).get_table_names()
+    if "survivors" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-        async with AsyncSessionLocal() as session:
-            items = [
-                ItemModel(name=ItemType.water, points=4),
-                ItemModel(name=ItemType.food, points=3),
-                ItemModel(name=ItemType.medication, points=2),
-                ItemModel(name=ItemType.ammunition, points=1),
-            ]
-            for item in items:
-                existing_item = await session.execute(
-                    select(ItemModel).where(ItemModel.name == item.name)
-                )
-                if not existing_item.scalar_one_or_none():
-                    session.add(item)
-            await session.commit()
+        await conn.run_sync(run_migrations)
+
+    async with AsyncSessionLocal() as session:
+        items = [
+            ItemModel(name=item_type, points=item_type.points)
+            for item_type in ItemType
+        ]
+        for item in items:
+            existing_item = await session.execute(
+                select(ItemModel).where(ItemModel.name == item.name)
+            )
+            if not existing_item.scalar_one_or_none():
+                session.add(item)
+        await session.commit()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def needs_primary(request: Request, now: Optional[float] = None) -> bool:
+    """Whether a read must see the client's own recent writes."""
+    if request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true"):
+        return True
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return (now or time.time()) - last_write < READ_YOUR_WRITES_WINDOW
+
+
+def sees_latest_writes(db: AsyncSession) -> bool:
+    """Whether ``db`` observes every committed write, unlike a lagging replica."""
+    return READ_DATABASE_URL is None or db.bind is engine
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_factory = (
+        AsyncSessionLocal if needs_primary(request) else AsyncReadSessionLocal
+    )
+    async with session_factory() as session:
+        yield session
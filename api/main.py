@@ -1,19 +1,115 @@
+import math
 import os
+import time
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import get_db, init_db
-from .models import Location, ReportInfection, Survivor, SurvivorCreate, Trade
-from .service.infection.infection_service import report_infection
+from .database import (
+    LAST_WRITE_COOKIE,
+    READ_YOUR_WRITES_WINDOW,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    engine,
+    get_db,
+    get_read_db,
+    init_db,
+    needs_primary,
+    read_engine,
+)
+from .models import (
+    AtRiskSurvivor,
+    InfectionReport,
+    InfectionShare,
+    ItemName,
+    Location,
+    LocationUpdate,
+    NearbySurvivor,
+    Offer,
+    OfferCreate,
+    OfferResult,
+    PointsLost,
+    ReportBatchResult,
+    ReportCluster,
+    ReportInfection,
+    ResourceAverages,
+    Survivor,
+    SurvivorBatchResult,
+    SurvivorCreate,
+    SuspiciousReporter,
+    Trade,
+    TradeBatchResult,
+)
+from .profiling import (
+    SERVER_TIMING,
+    instrument_engine,
+    log_request,
+    observe_request,
+    render_histograms,
+    render_metric,
+    server_timing,
+    start_profile,
+    stop_profile,
+)
+from .service.cache.survivor_cache import etag_for, survivor_cache
+from .service.events.broadcast import broadcast
+from .service.events.change_feed import change_feed, parse_event_id, sse_events
+from .service.graph.report_graph import load_report_graph, report_graph
+from .service.infection.infection_service import (
+    INFECTION_THRESHOLD,
+    MAX_REPORT_BATCH,
+    report_infection,
+    report_infections_batch,
+)
+from .service.inventory.inventory_service import ensure_inventory_layout
+from .service.inventory.item_catalog import load_item_catalog
+from .service.location.location_buffer import (
+    MAX_LOCATION_BATCH,
+    location_buffer,
+    uses_buffered_locations,
+)
+from .service.location.location_service import (
+    DEFAULT_NEARBY_LIMIT,
+    MAX_NEARBY_LIMIT,
+    MAX_RADIUS_KM,
+    get_nearby_survivors,
+)
+from .service.offers.offers_service import (
+    DEFAULT_OFFER_LIMIT,
+    MAX_OFFER_LIMIT,
+    cancel_offer,
+    create_offer,
+    get_open_offers,
+    load_order_book,
+    order_book,
+)
+from .service.reports.reports_service import (
+    ensure_population_stats,
+    get_infection_share,
+    get_points_lost,
+    get_resource_averages,
+)
 from .service.survivors.survivor_service import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    MAX_SURVIVOR_BATCH,
     create_survivor,
-    get_all_survivors,
-    get_survivor_by_name,
+    create_survivors_batch,
+    export_survivors_ndjson,
+    get_survivor_json_by_id,
+    get_survivor_json_by_name,
+    get_survivors_page_json,
     update_location,
+    update_locations,
+)
+from .service.trading.trading_service import (
+    MAX_TRADE_BATCH,
+    trade_items,
+    trade_items_batch,
 )
-from .service.trading.trading_service import trade_items
 
 app = FastAPI(title="ZSSN API", description="Zombie Survival Social Network API")
 
@@ -25,13 +121,131 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+instrument_engine(engine)
+instrument_engine(read_engine)
+
 db_dependency = Depends(get_db)
+read_db_dependency = Depends(get_read_db)
+trade_batch_body = Body(..., min_length=1, max_length=MAX_TRADE_BATCH)
+report_batch_body = Body(..., min_length=1, max_length=MAX_REPORT_BATCH)
+survivor_batch_body = Body(..., min_length=1, max_length=MAX_SURVIVOR_BATCH)
+location_batch_body = Body(..., min_length=1, max_length=MAX_LOCATION_BATCH)
+
+def json_with_etag(request: Request, body: bytes, headers: dict = None) -> Response:
+    """Send pre-serialized JSON, or 304 if the client already has this version."""
+    headers = {**(headers or {}), "ETag": etag_for(body)}
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.middleware("http")
+async def remember_writes(request: Request, call_next):
+    """Mark clients that just wrote so their next reads go to the primary."""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            str(time.time()),
+            max_age=math.ceil(READ_YOUR_WRITES_WINDOW),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Record per-request SQL activity for Server-Timing, logs and /metrics."""
+    profile, token = start_profile()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        stop_profile(token)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    observe_request(
+        request.method, route_path, response.status_code, profile, elapsed
+    )
+    log_request(request.method, route_path, response.status_code, profile, elapsed)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(profile, elapsed)
+    return response
+
+DATABASE_PREPARED_ENV = "ZSSN_DATABASE_PREPARED"
+
+async def prepare_database():
+    """Migrate and backfill the database. Safe to run again on every start."""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        await load_item_catalog(session)
+        await ensure_inventory_layout(session)
+        await ensure_population_stats(session)
 
 @app.on_event("startup")
 async def startup():
-    await init_db()
+    # Read at startup: api.serve sets it after preparing the database once.
+    if not os.getenv(DATABASE_PREPARED_ENV):
+        await prepare_database()
+    # Listen before loading in-memory state so no peer update is missed.
+    await broadcast.start()
+    async with AsyncSessionLocal() as session:
+        await load_order_book(session)
+        await load_report_graph(session)
+    if uses_buffered_locations():
+        await location_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    try:
+        await location_buffer.stop()
+    finally:
+        broadcast.stop()
+
+@app.get("/metrics", include_in_schema=False)
+async def endpoint_metrics():
+    cache = survivor_cache.stats()
+    feed = change_feed.stats()
+    metrics = [
+        render_histograms(),
+        render_metric(
+            "zssn_survivor_cache_hits_total", "counter",
+            "Survivor cache hits.", cache["hits"],
+        ),
+        render_metric(
+            "zssn_survivor_cache_misses_total", "counter",
+            "Survivor cache misses.", cache["misses"],
+        ),
+        render_metric(
+            "zssn_change_feed_events_total", "counter",
+            "Change feed events published.", feed["published"],
+        ),
+        render_metric(
+            "zssn_change_feed_subscribers", "gauge",
+            "Connected change feed subscribers.", feed["subscribers"],
+        ),
+        render_metric(
+            "zssn_location_buffer_pending", "gauge",
+            "Location updates waiting to be flushed.",
+            location_buffer.stats()["pending"],
+        ),
+        render_metric(
+            "zssn_open_offers", "gauge",
+            "Open trade offers in the order book.", len(order_book),
+        ),
+        render_metric(
+            "zssn_broadcast_dropped_total", "counter",
+            "Cross-worker messages that could not be delivered.",
+            broadcast.stats()["dropped"],
+        ),
+    ]
+    return Response(
+        "\n".join(metrics) + "\n", media_type="text/plain; version=0.0.4"
+    )
 
 @app.get("/api")
 async def root():
@@ -44,14 +258,50 @@ async def endpoint_create_survivor(
 ):
     return await create_survivor(survivor, db)
 
+@app.post("/api/survivors/batch", response_model=SurvivorBatchResult)
+async def endpoint_create_survivors_batch(
+    survivors: List[SurvivorCreate] = survivor_batch_body,
+    db: AsyncSession = db_dependency
+):
+    return await create_survivors_batch(survivors, db)
+
+@app.put("/api/survivors/locations")
+async def endpoint_update_locations(
+    response: Response,
+    updates: List[LocationUpdate] = location_batch_body,
+    db: AsyncSession = db_dependency
+):
+    if uses_buffered_locations():
+        location_buffer.put_many(updates)
+        response.status_code = 202
+        return {"message": "Location updates accepted", "accepted": len(updates)}
+
+    updated = await update_locations(
+        {
+            u.survivor_id: Location(latitude=u.latitude, longitude=u.longitude)
+            for u in updates
+        },
+        db,
+    )
+    return {"message": "Locations updated successfully", "updated": updated}
+
 @app.put("/api/survivors/{survivor_id}/location")
 async def endpoint_update_location(
     survivor_id: int,
     location: Location,
+    response: Response,
     db: AsyncSession = db_dependency
 ):
+    if uses_buffered_locations():
+        location_buffer.put(survivor_id, location)
+        response.status_code = 202
+        return {"message": "Location update accepted"}
     return await update_location(survivor_id, location, db)
 
+@app.get("/api/locations/metrics")
+async def endpoint_location_metrics():
+    return location_buffer.stats()
+
 @app.post("/api/survivors/{survivor_id}/report")
 async def endpoint_report_infection(
     survivor_id: int,
@@ -60,6 +310,13 @@ async def endpoint_report_infection(
 ):
     return await report_infection(survivor_id, report, db)
 
+@app.post("/api/reports/batch", response_model=ReportBatchResult)
+async def endpoint_report_infections_batch(
+    reports: List[InfectionReport] = report_batch_body,
+    db: AsyncSession = db_dependency
+):
+    return await report_infections_batch(reports, db)
+
 @app.post("/api/trade")
 async def endpoint_trade(
     trade: Trade,
@@ -67,18 +324,173 @@ async def endpoint_trade(
 ):
     return await trade_items(trade, db)
 
+@app.post("/api/trades/batch", response_model=TradeBatchResult)
+async def endpoint_trade_batch(
+    trades: List[Trade] = trade_batch_body,
+    atomic: bool = True,
+    db: AsyncSession = db_dependency
+):
+    return await trade_items_batch(trades, db, atomic=atomic)
+
+@app.post("/api/offers", response_model=OfferResult)
+async def endpoint_create_offer(
+    offer: OfferCreate,
+    db: AsyncSession = db_dependency
+):
+    return await create_offer(offer, db)
+
+@app.get("/api/offers", response_model=list[Offer])
+async def endpoint_list_offers(
+    survivor_id: Optional[int] = None,
+    give_item: Optional[ItemName] = None,
+    want_item: Optional[ItemName] = None,
+    limit: int = Query(DEFAULT_OFFER_LIMIT, ge=1, le=MAX_OFFER_LIMIT),
+    db: AsyncSession = read_db_dependency
+):
+    return await get_open_offers(
+        db,
+        survivor_id=survivor_id,
+        give_item=give_item,
+        want_item=want_item,
+        limit=limit,
+    )
+
+@app.delete("/api/offers/{offer_id}", response_model=Offer)
+async def endpoint_cancel_offer(
+    offer_id: int,
+    db: AsyncSession = db_dependency
+):
+    return await cancel_offer(offer_id, db)
+
 @app.get("/api/survivors", response_model=list[Survivor])
 async def endpoint_list_survivors(
-    db: AsyncSession = db_dependency
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = read_db_dependency
+):
+    body, next_cursor = await get_survivors_page_json(db, limit=limit, cursor=cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return json_with_etag(request, body, headers)
+
+@app.get("/api/survivors/nearby", response_model=list[NearbySurvivor])
+async def endpoint_nearby_survivors(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_NEARBY_LIMIT, ge=1, le=MAX_NEARBY_LIMIT),
+    db: AsyncSession = read_db_dependency
+):
+    return await get_nearby_survivors(lat, lon, radius_km, db, limit=limit)
+
+@app.get("/api/survivors/export")
+async def endpoint_export_survivors(
+    request: Request,
+    infected: Optional[bool] = None,
+    min_latitude: Optional[float] = Query(None, ge=-90, le=90),
+    max_latitude: Optional[float] = Query(None, ge=-90, le=90),
+    min_longitude: Optional[float] = Query(None, ge=-180, le=180),
+    max_longitude: Optional[float] = Query(None, ge=-180, le=180),
 ):
-    return await get_all_survivors(db)
+    # The stream outlives the request handler, so it owns its session.
+    session_factory = (
+        AsyncSessionLocal if needs_primary(request) else AsyncReadSessionLocal
+    )
+
+    async def ndjson():
+        async with session_factory() as session:
+            async for chunk in export_survivors_ndjson(
+                session,
+                infected=infected,
+                min_latitude=min_latitude,
+                max_latitude=max_latitude,
+                min_longitude=min_longitude,
+                max_longitude=max_longitude,
+            ):
+                yield chunk
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/api/survivors/changes")
+async def endpoint_survivor_changes(
+    request: Request,
+    since: Optional[str] = Query(None, pattern=r"^([0-9a-f]+-)?[0-9]+$"),
+):
+    """Server-sent events for every committed survivor change.
+
+    Resume with ``?since=<epoch>-<seq>`` or the ``Last-Event-ID`` header that
+    EventSource sends on reconnect, both in the format of the event ids. Event
+    ids carry the serving worker's epoch, so resuming against a different
+    worker starts with a reset.
+    """
+    if since is None:
+        since = request.headers.get("last-event-id", "")
+    epoch, seq = parse_event_id(since)
+    subscription = change_feed.subscribe(seq, epoch=epoch)
+    return StreamingResponse(
+        sse_events(subscription, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/survivors/name/{name}", response_model=Survivor)
 async def endpoint_get_survivor_name(
     name: str,
-    db: AsyncSession = db_dependency
+    request: Request,
+    db: AsyncSession = read_db_dependency
+):
+    body = await get_survivor_json_by_name(
+        name, db, use_cache=not needs_primary(request)
+    )
+    if body is None:
+        raise HTTPException(status_code=404, detail="Survivor not found")
+    return json_with_etag(request, body)
+
+@app.get("/api/survivors/{survivor_id:int}", response_model=Survivor)
+async def endpoint_get_survivor(
+    survivor_id: int,
+    request: Request,
+    db: AsyncSession = read_db_dependency
 ):
-    survivor = await get_survivor_by_name(name, db)
-    if not survivor:
+    body = await get_survivor_json_by_id(
+        survivor_id, db, use_cache=not needs_primary(request)
+    )
+    if body is None:
         raise HTTPException(status_code=404, detail="Survivor not found")
-    return survivor
+    return json_with_etag(request, body)
+
+@app.get("/api/reports/infected", response_model=InfectionShare)
+async def endpoint_report_infected(db: AsyncSession = read_db_dependency):
+    return await get_infection_share(db, infected=True)
+
+@app.get("/api/reports/non-infected", response_model=InfectionShare)
+async def endpoint_report_non_infected(db: AsyncSession = read_db_dependency):
+    return await get_infection_share(db, infected=False)
+
+@app.get("/api/reports/resources", response_model=ResourceAverages)
+async def endpoint_report_resources(db: AsyncSession = read_db_dependency):
+    return await get_resource_averages(db)
+
+@app.get("/api/reports/points-lost", response_model=PointsLost)
+async def endpoint_report_points_lost(db: AsyncSession = read_db_dependency):
+    return await get_points_lost(db)
+
+@app.get("/api/graph/at-risk", response_model=list[AtRiskSurvivor])
+async def endpoint_graph_at_risk():
+    """Healthy survivors one report away from being marked infected."""
+    return report_graph.at_risk(INFECTION_THRESHOLD)
+
+@app.get("/api/graph/clusters", response_model=list[ReportCluster])
+async def endpoint_graph_clusters(
+    min_size: int = Query(2, ge=2),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    return report_graph.clusters(min_size, limit)
+
+@app.get("/api/graph/suspicious-reporters", response_model=list[SuspiciousReporter])
+async def endpoint_graph_suspicious_reporters(
+    min_reports: int = Query(3, ge=1),
+    max_confirmation_rate: float = Query(0.2, ge=0, le=1),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    return report_graph.suspicious_reporters(min_reports, max_confirmation_rate, limit)
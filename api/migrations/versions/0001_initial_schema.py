@@ -0,0 +1,79 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+item_type = sa.Enum("water", "food", "medication", "ammunition", name="itemtype")
+gender = sa.Enum("male", "female", "other", name="gender")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", item_type, unique=True),
+        sa.Column("points", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_items_id", "items", ["id"])
+
+    op.create_table(
+        "survivors",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("age", sa.Integer()),
+        sa.Column("gender", gender),
+        sa.Column("latitude", sa.Float()),
+        sa.Column("longitude", sa.Float()),
+        sa.Column("infected", sa.Boolean()),
+    )
+    op.create_index("ix_survivors_id", "survivors", ["id"])
+    op.create_index("ix_survivors_name", "survivors", ["name"], unique=True)
+
+    op.create_table(
+        "survivor_items",
+        sa.Column(
+            "survivor_id",
+            sa.Integer(),
+            sa.ForeignKey("survivors.id"),
+            primary_key=True,
+        ),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "infection_reports",
+        sa.Column(
+            "reporter_id",
+            sa.Integer(),
+            sa.ForeignKey("survivors.id"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "reported_id",
+            sa.Integer(),
+            sa.ForeignKey("survivors.id"),
+            primary_key=True,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("infection_reports")
+    op.drop_table("survivor_items")
+    op.drop_index("ix_survivors_name", table_name="survivors")
+    op.drop_index("ix_survivors_id", table_name="survivors")
+    op.drop_table("survivors")
+    op.drop_index("ix_items_id", table_name="items")
+    op.drop_table("items")
+    item_type.drop(op.get_bind(), checkfirst=True)
+    gender.drop(op.get_bind(), checkfirst=True)
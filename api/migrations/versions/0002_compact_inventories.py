@@ -0,0 +1,37 @@
+"""Add the compact inventories table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "inventories" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    # Rows are filled by ensure_inventory_layout() when INVENTORY_LAYOUT=compact.
+    op.create_table(
+        "inventories",
+        sa.Column(
+            "survivor_id",
+            sa.Integer(),
+            sa.ForeignKey("survivors.id"),
+            primary_key=True,
+        ),
+        sa.Column("water", sa.Integer(), nullable=False),
+        sa.Column("food", sa.Integer(), nullable=False),
+        sa.Column("medication", sa.Integer(), nullable=False),
+        sa.Column("ammunition", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("inventories")
@@ -0,0 +1,35 @@
+"""Add survivors.report_count and backfill it from infection_reports
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("survivors")}
+    if "report_count" not in columns:
+        with op.batch_alter_table("survivors") as batch:
+            batch.add_column(
+                sa.Column(
+                    "report_count", sa.Integer(), nullable=False, server_default="0"
+                )
+            )
+
+    op.execute(
+        "UPDATE survivors SET report_count = ("
+        "SELECT count(*) FROM infection_reports"
+        " WHERE infection_reports.reported_id = survivors.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("survivors") as batch:
+        batch.drop_column("report_count")
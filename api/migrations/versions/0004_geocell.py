@@ -0,0 +1,67 @@
+"""Add the indexed survivors.geocell column and backfill it
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+import math
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the grid in api.service.location.geo as of this revision.
+CELL_SIZE = 0.1
+CELL_ROWS = 1800
+CELL_COLUMNS = 3600
+
+
+def geocell(latitude: float, longitude: float) -> int:
+    row = min(CELL_ROWS - 1, max(0, math.floor((latitude + 90) / CELL_SIZE)))
+    column = math.floor((longitude + 180) / CELL_SIZE) % CELL_COLUMNS
+    return row * CELL_COLUMNS + column
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "geocell" not in {c["name"] for c in inspector.get_columns("survivors")}:
+        with op.batch_alter_table("survivors") as batch:
+            batch.add_column(sa.Column("geocell", sa.Integer()))
+    if "ix_survivors_geocell" not in {
+        index["name"] for index in inspector.get_indexes("survivors")
+    }:
+        op.create_index("ix_survivors_geocell", "survivors", ["geocell"])
+
+    survivors = sa.table(
+        "survivors",
+        sa.column("id", sa.Integer),
+        sa.column("latitude", sa.Float),
+        sa.column("longitude", sa.Float),
+        sa.column("geocell", sa.Integer),
+    )
+    rows = bind.execute(
+        sa.select(survivors.c.id, survivors.c.latitude, survivors.c.longitude).where(
+            survivors.c.geocell.is_(None), survivors.c.latitude.is_not(None)
+        )
+    ).all()
+    if rows:
+        bind.execute(
+            survivors.update()
+            .where(survivors.c.id == sa.bindparam("survivor_id"))
+            .values(geocell=sa.bindparam("cell")),
+            [
+                {"survivor_id": row.id, "cell": geocell(row.latitude, row.longitude)}
+                for row in rows
+            ],
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_survivors_geocell", table_name="survivors")
+    with op.batch_alter_table("survivors") as batch:
+        batch.drop_column("geocell")
@@ -0,0 +1,74 @@
+"""Add the unique survivors.name_lower column for case-insensitive lookups
+
+Existing names that only differ by case are made unique first: the oldest
+survivor keeps its name and the others get their id appended.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+import logging
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "name_lower" not in {c["name"] for c in inspector.get_columns("survivors")}:
+        with op.batch_alter_table("survivors") as batch:
+            batch.add_column(sa.Column("name_lower", sa.String()))
+
+    survivors = sa.table(
+        "survivors",
+        sa.column("id", sa.Integer),
+        sa.column("name", sa.String),
+        sa.column("name_lower", sa.String),
+    )
+    rows = bind.execute(
+        sa.select(survivors.c.id, survivors.c.name).order_by(survivors.c.id)
+    ).all()
+    taken = {row.name.lower() for row in rows}
+    seen = set()
+    updates = []
+    for row in rows:
+        name = row.name
+        if name.lower() in seen:
+            name = f"{row.name} ({row.id})"
+            while name.lower() in taken:
+                name += "'"
+            taken.add(name.lower())
+            logger.warning("Renaming survivor %s from %r to %r", row.id, row.name, name)
+        seen.add(name.lower())
+        updates.append({"survivor_id": row.id, "new_name": name, "lower": name.lower()})
+
+    if updates:
+        bind.execute(
+            survivors.update()
+            .where(survivors.c.id == sa.bindparam("survivor_id"))
+            .values(name=sa.bindparam("new_name"), name_lower=sa.bindparam("lower")),
+            updates,
+        )
+
+    with op.batch_alter_table("survivors") as batch:
+        batch.alter_column("name_lower", existing_type=sa.String(), nullable=False)
+    if "ix_survivors_name_lower" not in {
+        index["name"] for index in inspector.get_indexes("survivors")
+    }:
+        op.create_index(
+            "ix_survivors_name_lower", "survivors", ["name_lower"], unique=True
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_survivors_name_lower", table_name="survivors")
+    with op.batch_alter_table("survivors") as batch:
+        batch.drop_column("name_lower")
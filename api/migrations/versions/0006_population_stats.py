@@ -0,0 +1,33 @@
+"""Add the population_stats summary table
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "population_stats" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    # Rows are filled by ensure_population_stats() on startup.
+    op.create_table(
+        "population_stats",
+        sa.Column("infected", sa.Boolean(), primary_key=True),
+        sa.Column("survivors", sa.Integer(), nullable=False),
+        sa.Column("water", sa.Integer(), nullable=False),
+        sa.Column("food", sa.Integer(), nullable=False),
+        sa.Column("medication", sa.Integer(), nullable=False),
+        sa.Column("ammunition", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("population_stats")
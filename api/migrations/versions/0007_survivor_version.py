@@ -0,0 +1,27 @@
+"""Add survivors.version for optimistic concurrency control of trades
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("survivors")}
+    if "version" not in columns:
+        with op.batch_alter_table("survivors") as batch:
+            batch.add_column(
+                sa.Column("version", sa.Integer(), nullable=False, server_default="0")
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("survivors") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,38 @@
+"""Add the trade_offers table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "trade_offers" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "trade_offers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "survivor_id", sa.Integer(), sa.ForeignKey("survivors.id"), nullable=False
+        ),
+        sa.Column("give_item", sa.String(), nullable=False),
+        sa.Column("want_item", sa.String(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+    )
+    op.create_index("ix_trade_offers_survivor_id", "trade_offers", ["survivor_id"])
+    op.create_index("ix_trade_offers_status", "trade_offers", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_trade_offers_status", table_name="trade_offers")
+    op.drop_index("ix_trade_offers_survivor_id", table_name="trade_offers")
+    op.drop_table("trade_offers")
@@ -0,0 +1,33 @@
+"""Add trade_offers.posted_units so offers keep the size they were posted with
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {
+        c["name"] for c in sa.inspect(op.get_bind()).get_columns("trade_offers")
+    }
+    if "posted_units" not in columns:
+        with op.batch_alter_table("trade_offers") as batch:
+            batch.add_column(
+                sa.Column(
+                    "posted_units", sa.Integer(), nullable=False, server_default="0"
+                )
+            )
+        # Fills already taken from older offers are not recorded anywhere.
+        op.execute("UPDATE trade_offers SET posted_units = units")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trade_offers") as batch:
+        batch.drop_column("posted_units")
@@ -0,0 +1,29 @@
+"""Add the app_metadata table, recording which inventory layout holds the data
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "app_metadata" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    # Left empty: ensure_inventory_layout() records the layout on startup.
+    op.create_table(
+        "app_metadata",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("value", sa.String(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("app_metadata")
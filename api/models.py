@@ -1,8 +1,10 @@
 from enum import Enum
-from typing import List
+from typing import List, Literal
 
 from pydantic import BaseModel, Field
 
+ItemName = Literal["water", "food", "medication", "ammunition"]
+
 
 class Gender(str, Enum):
     male = "male"
@@ -13,6 +15,9 @@ class Location(BaseModel):
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
 
+class LocationUpdate(Location):
+    survivor_id: int
+
 class Inventory(BaseModel):
     water: int = Field(default=0, ge=0)
     food: int = Field(default=0, ge=0)
@@ -38,9 +43,33 @@ class Survivor(BaseModel):
     inventory: Inventory
     reporters: List[int] = []
 
+class NearbySurvivor(Survivor):
+    distance_km: float
+
+class SurvivorBatchError(BaseModel):
+    index: int
+    name: str
+    detail: str
+
+class SurvivorBatchResult(BaseModel):
+    created: List[Survivor]
+    errors: List[SurvivorBatchError]
+
 class ReportInfection(BaseModel):
     reporter_id: int
 
+class InfectionReport(BaseModel):
+    reporter_id: int
+    reported_id: int
+
+class RejectedReport(InfectionReport):
+    reason: str
+
+class ReportBatchResult(BaseModel):
+    accepted: List[InfectionReport]
+    rejected: List[RejectedReport]
+    newly_infected: List[int]
+
 class TradeItem(BaseModel):
     survivor_id: int
     items: Inventory
@@ -48,3 +77,73 @@ class TradeItem(BaseModel):
 class Trade(BaseModel):
     trader1: TradeItem
     trader2: TradeItem
+
+class TradeResult(BaseModel):
+    index: int
+    success: bool
+    detail: str
+
+class TradeBatchResult(BaseModel):
+    applied: bool
+    results: List[TradeResult]
+
+class InfectionShare(BaseModel):
+    survivors: int
+    total: int
+    percentage: float
+
+class ResourceAverages(BaseModel):
+    healthy_survivors: int
+    water: float
+    food: float
+    medication: float
+    ammunition: float
+
+class PointsLost(BaseModel):
+    infected_survivors: int
+    points_lost: int
+    items: Inventory
+
+class OfferCreate(BaseModel):
+    survivor_id: int
+    give_item: ItemName
+    give_quantity: int = Field(..., gt=0)
+    want_item: ItemName
+    want_quantity: int = Field(..., gt=0)
+
+class Offer(BaseModel):
+    id: int
+    survivor_id: int
+    give_item: ItemName
+    give_quantity: int
+    want_item: ItemName
+    want_quantity: int
+    remaining_give_quantity: int
+    remaining_want_quantity: int
+    status: str
+
+class OfferFill(BaseModel):
+    counter_offer_id: int
+    counterparty_id: int
+    given: int
+    received: int
+
+class OfferResult(BaseModel):
+    offer: Offer
+    fills: List[OfferFill]
+
+class AtRiskSurvivor(BaseModel):
+    id: int
+    reporters: List[int]
+
+class ReportCluster(BaseModel):
+    size: int
+    reports: int
+    infected: int
+    survivors: List[int]
+
+class SuspiciousReporter(BaseModel):
+    reporter_id: int
+    reports: int
+    confirmed: int
+    confirmation_rate: float
@@ -0,0 +1,239 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("api.requests")
+
+# Requests slower than this, or running more statements, are logged as warnings.
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+STATEMENT_WARNING_THRESHOLD = int(os.getenv("STATEMENT_WARNING_THRESHOLD", "20"))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+
+class QueryProfile:
+    """Database activity attributed to one request."""
+
+    __slots__ = (
+        "statements",
+        "db_seconds",
+        "pool_wait_seconds",
+        "slowest_seconds",
+        "slowest_statement",
+    )
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+# Context variables follow the request into SQLAlchemy's greenlets, so the
+# engine hooks below can find the profile of the request that issued a query.
+_current_profile: contextvars.ContextVar[Optional[QueryProfile]] = (
+    contextvars.ContextVar("query_profile", default=None)
+)
+
+
+def start_profile() -> Tuple[QueryProfile, contextvars.Token]:
+    profile = QueryProfile()
+    return profile, _current_profile.set(profile)
+
+
+def stop_profile(token: contextvars.Token) -> None:
+    _current_profile.reset(token)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+
+
+def _handle_error(context) -> None:
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def _time_pool_checkouts(sync_engine) -> None:
+    pool = sync_engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            profile = _current_profile.get()
+            if profile is not None:
+                profile.pool_wait_seconds += time.perf_counter() - start
+
+    pool.connect = timed_connect
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attribute statements and pool checkouts on ``engine`` to the current request.
+
+    Pool wait is the time spent in ``Pool.connect``: waiting for a free
+    connection, or opening a new one when the pool is not yet full. Pool
+    events only fire once a connection is checked out, so the timer wraps the
+    pool itself and is put back on every new pool ``engine.dispose()`` creates.
+    """
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    event.listen(sync_engine, "engine_disposed", _time_pool_checkouts)
+    _time_pool_checkouts(sync_engine)
+
+
+def server_timing(profile: QueryProfile, total_seconds: float) -> str:
+    queries = f'desc="{profile.statements} queries"'
+    return ", ".join(
+        [
+            f"db;dur={profile.db_seconds * 1000:.2f};{queries}",
+            f"db-slowest;dur={profile.slowest_seconds * 1000:.2f}",
+            f"pool;dur={profile.pool_wait_seconds * 1000:.2f}",
+            f"total;dur={total_seconds * 1000:.2f}",
+        ]
+    )
+
+
+def log_request(
+    method: str, route: str, status: int, profile: QueryProfile, seconds: float
+) -> None:
+    duration_ms = seconds * 1000
+    slow = (
+        duration_ms >= SLOW_REQUEST_MS
+        or profile.statements > STATEMENT_WARNING_THRESHOLD
+    )
+    level = logging.WARNING if slow else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        json.dumps(
+            {
+                "event": "request",
+                "method": method,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "db_statements": profile.statements,
+                "db_ms": round(profile.db_seconds * 1000, 2),
+                "pool_wait_ms": round(profile.pool_wait_seconds * 1000, 2),
+                "slowest_statement_ms": round(profile.slowest_seconds * 1000, 2),
+                "slowest_statement": profile.slowest_statement,
+            }
+        ),
+    )
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[Tuple[str, str], ...], Tuple[list, list]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        counts, total = self._series.setdefault(
+            key, ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            cumulative = 0
+            for bound, count in zip([*self.buckets, float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{labels}}} {total[0]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metric(name: str, kind: str, help: str, value: float) -> str:
+    return f"# HELP {name} {help}\n# TYPE {name} {kind}\n{name} {float(value or 0)}"
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_duration = Histogram(
+    "zssn_http_request_duration_seconds",
+    "Time spent handling requests, per route.",
+    LATENCY_BUCKETS,
+)
+db_statements = Histogram(
+    "zssn_db_statements_per_request",
+    "SQL statements executed per request, per route.",
+    (0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+db_time = Histogram(
+    "zssn_db_time_seconds",
+    "Time spent executing SQL per request, per route.",
+    LATENCY_BUCKETS,
+)
+pool_wait = Histogram(
+    "zssn_db_pool_wait_seconds",
+    "Time spent acquiring database connections per request, per route.",
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+
+def observe_request(
+    method: str, route: str, status: int, profile: QueryProfile, seconds: float
+) -> None:
+    request_duration.observe(seconds, method=method, route=route, status=str(status))
+    db_statements.observe(profile.statements, method=method, route=route)
+    db_time.observe(profile.db_seconds, method=method, route=route)
+    pool_wait.observe(profile.pool_wait_seconds, method=method, route=route)
+
+
+def render_histograms() -> str:
+    return "\n".join(
+        histogram.render()
+        for histogram in (request_duration, db_statements, db_time, pool_wait)
+    )
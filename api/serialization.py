@@ -0,0 +1,32 @@
+import json
+from typing import Any, Iterable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when the extra is missing
+    orjson = None
+
+# Same compact, UTF-8 output as Pydantic's ``model_dump_json``.
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(value: Any) -> bytes:
+    """Encode plain Python data as JSON bytes.
+
+    Uses orjson when the ``fast`` extra is installed and falls back to the
+    standard library otherwise. Enums are written as their values.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _encoder.encode(value).encode()
+
+
+def dumps_array(values: Iterable[Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(values if isinstance(values, list) else list(values))
+    return b"[" + b",".join(dumps(value) for value in values) + b"]"
+
+
+def dumps_lines(values: Iterable[Any]) -> bytes:
+    """Encode values as newline-delimited JSON."""
+    return b"".join(dumps(value) + b"\n" for value in values)
@@ -0,0 +1,82 @@
+"""
+Run the API in one or more worker processes.
+
+The database is migrated once before any worker starts. With more than one
+worker, the workers share a broadcast directory through which they keep
+their in-process state (survivor cache, change feed, order book, report
+graph) in step.
+
+Usage: python -m api.serve --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import uvicorn
+from sqlalchemy.engine import make_url
+
+from api.database import DATABASE_URL, engine, read_engine
+from api.main import DATABASE_PREPARED_ENV, prepare_database
+from api.service.location.location_buffer import uses_buffered_locations
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def check_database_url(url: str, workers: int) -> None:
+    """Refuse database setups that are not safe to share between processes."""
+    parsed = make_url(url)
+    if workers > 1 and parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            raise SystemExit("An in-memory SQLite database cannot be shared by workers")
+
+
+def check_location_mode(workers: int) -> None:
+    """Refuse buffered location ingest when pings may land on different workers.
+
+    Each worker flushes its own buffer, so a stale ping held by one worker
+    could overwrite a newer one already flushed by another.
+    """
+    if workers > 1 and uses_buffered_locations():
+        raise SystemExit(
+            "LOCATION_INGEST_MODE=buffered needs a single worker; use direct"
+        )
+
+
+async def prepare() -> None:
+    await prepare_database()
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    check_database_url(DATABASE_URL, args.workers)
+    check_location_mode(args.workers)
+    asyncio.run(prepare())
+    # Inherited by the workers, which then skip prepare_database().
+    os.environ[DATABASE_PREPARED_ENV] = "1"
+
+    with tempfile.TemporaryDirectory(prefix="zssn-broadcast-") as directory:
+        if args.workers > 1:
+            # Read by every worker when it imports the application.
+            os.environ.setdefault("BROADCAST_DIR", directory)
+        uvicorn.run(
+            "api.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level=args.log_level,
+        )
+
+
+if __name__ == "__main__":
+    main()
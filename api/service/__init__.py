@@ -1,28 +1,57 @@
 """
 ZSSN API service package
 """
-from api.service.infection.infection_service import report_infection
+from api.service.infection.infection_service import (
+    report_infection,
+    report_infections_batch,
+)
 from api.service.inventory.inventory_service import (
+    add_inventories,
     add_inventory_items,
+    get_inventories,
     get_survivor_inventory,
 )
+from api.service.reports.reports_service import (
+    get_infection_share,
+    get_points_lost,
+    get_resource_averages,
+)
 from api.service.survivors.survivor_service import (
     create_survivor,
+    create_survivors_batch,
+    export_survivors_ndjson,
     get_all_survivors,
     get_survivor_by_id,
     get_survivor_by_name,
+    get_survivor_json_by_id,
+    get_survivor_json_by_name,
+    get_survivors_by_ids,
+    get_survivors_page_json,
     update_location,
 )
-from api.service.trading.trading_service import trade_items
+from api.service.trading.trading_service import trade_items, trade_items_batch
 
 __all__ = [
     "create_survivor",
+    "create_survivors_batch",
     "update_location",
     "get_all_survivors",
     "get_survivor_by_id",
     "get_survivor_by_name",
+    "get_survivor_json_by_id",
+    "get_survivor_json_by_name",
+    "get_survivors_by_ids",
+    "get_survivors_page_json",
+    "export_survivors_ndjson",
     "get_survivor_inventory",
+    "get_inventories",
     "add_inventory_items",
+    "add_inventories",
     "report_infection",
+    "report_infections_batch",
+    "get_infection_share",
+    "get_resource_averages",
+    "get_points_lost",
     "trade_items",
+    "trade_items_batch",
 ]
@@ -0,0 +1,3 @@
+"""
+ZSSN API cache service package
+"""
@@ -0,0 +1,158 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from api.serialization import dumps
+from api.service.cache.backends import (
+    CacheBackend,
+    LocalRedis,
+    LRUCache,
+    NullCache,
+    RedisCache,
+)
+from api.service.events.broadcast import broadcast
+
+# "memory" (default), "redis" or "none".
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL")
+# Keeps invalidation datagrams to other workers well under the socket limits.
+BROADCAST_CHUNK_SIZE = 1000
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class SurvivorCache:
+    """Serialized survivor JSON keyed by id, plus a name -> id index.
+
+    Writers invalidate by id only: names never change, so a name entry keeps
+    pointing at the right id and simply misses until the id entry is
+    refilled. With a per-process backend, invalidations are also broadcast to
+    the other workers.
+
+    A read that fills the cache takes a ``fill_token`` before querying, and
+    ``store`` drops the fill if the survivor was invalidated since, so a read
+    racing a write cannot cache the old row. Only the latest ``max_tracked``
+    invalidations are remembered; fills older than those are dropped too.
+    Fills racing a write in another process are bounded by the TTL.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float = CACHE_TTL,
+        max_tracked: int = CACHE_MAX_ENTRIES,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_tracked = max_tracked
+        self.hits = 0
+        self.misses = 0
+        self.rejected_fills = 0
+        self._seq = 0
+        # survivor id -> sequence number of its latest invalidation, oldest first.
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._forgotten_seq = 0
+
+    async def get_by_id(self, survivor_id: int) -> Optional[bytes]:
+        body = await self.backend.get(f"survivor:id:{survivor_id}")
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def get_by_name(self, name: str) -> Optional[bytes]:
+        survivor_id = await self.backend.get(f"survivor:name:{name.lower()}")
+        if survivor_id is None:
+            self.misses += 1
+            return None
+        return await self.get_by_id(int(survivor_id))
+
+    def fill_token(self) -> int:
+        return self._seq
+
+    def _invalidated_since(self, survivor_id: int, token: int) -> bool:
+        return (
+            token < self._forgotten_seq
+            or self._invalidated.get(survivor_id, 0) > token
+        )
+
+    def _mark_invalidated(self, survivor_ids: Iterable[int]) -> None:
+        for survivor_id in survivor_ids:
+            self._seq += 1
+            self._invalidated.pop(survivor_id, None)
+            self._invalidated[survivor_id] = self._seq
+        while len(self._invalidated) > self.max_tracked:
+            _, self._forgotten_seq = self._invalidated.popitem(last=False)
+
+    async def store(self, survivor: dict, token: int) -> bytes:
+        """Cache a survivor payload as built by ``survivor_dicts``.
+
+        ``token`` is the ``fill_token`` taken before the survivor was read.
+        """
+        body = dumps(survivor)
+        if self._invalidated_since(survivor["id"], token):
+            self.rejected_fills += 1
+            return body
+        await self.backend.set(f"survivor:id:{survivor['id']}", body, self.ttl)
+        await self.backend.set(
+            f"survivor:name:{survivor['name'].lower()}",
+            str(survivor["id"]).encode(),
+            self.ttl,
+        )
+        return body
+
+    async def invalidate(self, survivor_ids: Iterable[int]) -> None:
+        survivor_ids = set(survivor_ids)
+        self._mark_invalidated(survivor_ids)
+        await self._delete([f"survivor:id:{i}" for i in survivor_ids])
+
+    async def forget(self, keys: List[str]) -> None:
+        """Apply keys invalidated by another worker."""
+        self._mark_invalidated(
+            int(key.rpartition(":")[2])
+            for key in keys
+            if key.startswith("survivor:id:")
+        )
+        await self.backend.delete(*keys)
+
+    async def invalidate_names(self, names: Iterable[str]) -> None:
+        await self._delete([f"survivor:name:{n.lower()}" for n in set(names)])
+
+    async def _delete(self, keys: List[str]) -> None:
+        await self.backend.delete(*keys)
+        if not self.backend.shared:
+            for start in range(0, len(keys), BROADCAST_CHUNK_SIZE):
+                broadcast.publish(
+                    "survivor_cache.delete",
+                    keys=keys[start:start + BROADCAST_CHUNK_SIZE],
+                )
+
+    def stats(self) -> dict:
+        return {
+            "backend": CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected_fills": self.rejected_fills,
+        }
+
+
+def _create_backend() -> CacheBackend:
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        if not REDIS_URL:
+            return RedisCache(LocalRedis())
+        import redis.asyncio as redis
+
+        return RedisCache(redis.from_url(REDIS_URL))
+    return LRUCache(max_entries=CACHE_MAX_ENTRIES)
+
+
+survivor_cache = SurvivorCache(_create_backend())
+broadcast.on("survivor_cache.delete", lambda data: survivor_cache.forget(data["keys"]))
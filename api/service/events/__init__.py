@@ -0,0 +1,3 @@
+"""
+ZSSN API change feed package
+"""
@@ -0,0 +1,141 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by the worker processes of one deployment; unset means a
+# single process and turns the broadcast into a no-op.
+BROADCAST_DIR = os.getenv("BROADCAST_DIR")
+# Requested socket buffer size; the kernel may cap it (net.core.[rw]mem_max).
+BROADCAST_BUFFER_BYTES = int(os.getenv("BROADCAST_BUFFER_BYTES", str(4 * 1024 * 1024)))
+
+Handler = Callable[[dict], object]
+
+
+class Broadcast:
+    """Best-effort fan-out of small messages to the other workers on this host.
+
+    Every worker binds a unix datagram socket named after its pid inside a
+    shared directory, and ``publish`` sends one JSON datagram to each other
+    socket there. It is the local stand-in for a pub/sub server: delivery is
+    at most once and a message is dropped (and counted) when a peer's buffer
+    is full or the message is too large, so whatever relies on it must stay
+    correct without it. The survivor cache has its TTL for that, and the
+    order book its guarded updates.
+    """
+
+    def __init__(self, directory: Optional[str] = BROADCAST_DIR):
+        self.directory = directory
+        self._handlers: Dict[str, Handler] = {}
+        self._sock: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+        self._peers: List[str] = []
+        self._peers_mtime: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._sock is not None
+
+    def on(self, channel: str, handler: Handler) -> None:
+        """Call ``handler(data)`` for messages other workers publish on ``channel``.
+
+        Coroutine handlers are scheduled as tasks.
+        """
+        self._handlers[channel] = handler
+
+    async def start(self) -> None:
+        if self.directory is None or self._sock is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+            sock.setsockopt(socket.SOL_SOCKET, option, BROADCAST_BUFFER_BYTES)
+        sock.bind(self._path)
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._receive)
+
+    def stop(self) -> None:
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+    def _peer_paths(self) -> List[str]:
+        # A directory's mtime changes whenever a socket is added or removed.
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime != self._peers_mtime:
+            self._peers_mtime = mtime
+            self._peers = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".sock")
+                and os.path.join(self.directory, name) != self._path
+            ]
+        return self._peers
+
+    def publish(self, channel: str, **data) -> None:
+        if self._sock is None:
+            return
+        message = json.dumps({"channel": channel, "data": data}).encode()
+        for peer in self._peer_paths():
+            try:
+                self._sock.sendto(message, peer)
+                self.sent += 1
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Left behind by a worker that died without cleaning up.
+                try:
+                    os.unlink(peer)
+                except FileNotFoundError:
+                    pass
+            except OSError as e:
+                self.dropped += 1
+                logger.warning("Broadcast on %s to %s dropped: %s", channel, peer, e)
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                message = self._sock.recv(1 << 20)
+            except BlockingIOError:
+                return
+            self.received += 1
+            try:
+                payload = json.loads(message)
+                handler = self._handlers.get(payload["channel"])
+                if handler is None:
+                    continue
+                result = handler(payload["data"])
+                if inspect.isawaitable(result):
+                    self._loop.create_task(result)
+            except Exception:
+                logger.exception("Failed to handle broadcast message")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+broadcast = Broadcast()
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import secrets
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, Set, Tuple
+
+from api.service.events.broadcast import broadcast
+
+CHANGE_FEED_HISTORY = int(os.getenv("CHANGE_FEED_HISTORY", "10000"))
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "1000"))
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+
+
+class ChangeEvent:
+    __slots__ = ("seq", "type", "data", "at")
+
+    def __init__(self, seq: int, type: str, data: dict, at: float):
+        self.seq = seq
+        self.type = type
+        self.data = data
+        self.at = at
+
+    def to_dict(self) -> dict:
+        return {"seq": self.seq, "type": self.type, "at": self.at, **self.data}
+
+    def to_sse(self, epoch: Optional[str] = None) -> bytes:
+        event_id = f"{epoch}-{self.seq}" if epoch else self.seq
+        return (
+            f"id: {event_id}\nevent: {self.type}\n"
+            f"data: {json.dumps(self.to_dict(), separators=(',', ':'))}\n\n"
+        ).encode()
+
+
+class Subscription:
+    """One subscriber's bounded queue of pending events.
+
+    A subscriber that falls ``queue_size`` events behind is cut off instead
+    of slowing down publishers or growing without bound: it drains what is
+    already queued and then ends, and reconnects with its last sequence
+    number to resume from the feed history.
+    """
+
+    def __init__(self, feed: "ChangeFeed", queue_size: int):
+        self.feed = feed
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event: ChangeEvent) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[ChangeEvent]:
+        """Return the next event, or None on timeout or once cut off and drained."""
+        if self.overflowed and self.queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.feed.unsubscribe(self)
+
+
+
+def parse_event_id(event_id: str) -> Tuple[Optional[str], Optional[int]]:
+    """Split an SSE event id ``<epoch>-<seq>`` (or a bare ``<seq>``)."""
+    epoch, _, seq = event_id.rpartition("-")
+    if not seq.isdigit():
+        return None, None
+    return epoch or None, int(seq)
+
+class ChangeFeed:
+    """In-process broadcaster of survivor changes with resumable sequence ids.
+
+    Services publish after their transaction commits. Every event gets the
+    next sequence number and is kept in a bounded history so a reconnecting
+    client can replay what it missed; if its position has already been
+    evicted (or belongs to an earlier server run) it receives a ``reset``
+    event and should reload the full state.
+
+    Sequence numbers are local to one process, so SSE event ids are prefixed
+    with a random per-process ``epoch``; resuming against another worker or
+    a restarted server resets. Events published in other workers arrive
+    through the broadcast and are numbered here like local ones.
+    """
+
+    def __init__(
+        self,
+        history: int = CHANGE_FEED_HISTORY,
+        queue_size: int = CHANGE_FEED_QUEUE_SIZE,
+    ):
+        self.queue_size = queue_size
+        self._history: Deque[ChangeEvent] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, type: str, **data) -> ChangeEvent:
+        broadcast.publish("change_feed", type=type, data=data)
+        return self.deliver(type, data)
+
+    def deliver(self, type: str, data: dict) -> ChangeEvent:
+        """Append an event and hand it to the local subscribers."""
+        self.seq += 1
+        event = ChangeEvent(self.seq, type, data, time.time())
+        self._history.append(event)
+        self.published += 1
+        for subscription in list(self._subscribers):
+            if not subscription.offer(event):
+                self._subscribers.discard(subscription)
+                self.dropped_subscribers += 1
+        return event
+
+    def subscribe(
+        self, last_seq: Optional[int] = None, epoch: Optional[str] = None
+    ) -> Subscription:
+        subscription = Subscription(self, self.queue_size)
+        if last_seq is not None:
+            oldest = self._history[0].seq if self._history else self.seq + 1
+            if (
+                (epoch is not None and epoch != self.epoch)
+                or last_seq > self.seq
+                or last_seq < oldest - 1
+            ):
+                subscription.offer(
+                    ChangeEvent(self.seq, "reset", {}, time.time())
+                )
+            else:
+                for event in self._history:
+                    if event.seq > last_seq and not subscription.offer(event):
+                        return subscription
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "published": self.published,
+            "subscribers": len(self._subscribers),
+            "dropped_subscribers": self.dropped_subscribers,
+            "history": len(self._history),
+        }
+
+
+async def sse_events(
+    subscription: Subscription,
+    heartbeat: float = CHANGE_FEED_HEARTBEAT,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[bytes]:
+    """Render a subscription as a ``text/event-stream`` body.
+
+    Idle periods produce comment heartbeats, which also give the stream a
+    chance to notice a client that went away.
+    """
+    try:
+        yield b"retry: 1000\n\n"
+        while True:
+            event = await subscription.next(timeout=heartbeat)
+            if event is not None:
+                yield event.to_sse(subscription.feed.epoch)
+            elif subscription.overflowed and subscription.queue.empty():
+                return
+            elif is_disconnected is not None and await is_disconnected():
+                return
+            else:
+                yield b": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+change_feed = ChangeFeed()
+broadcast.on(
+    "change_feed", lambda message: change_feed.deliver(message["type"], message["data"])
+)
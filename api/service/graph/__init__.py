@@ -0,0 +1,3 @@
+"""
+ZSSN API report graph service package
+"""
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import SurvivorModel, infection_reports
+from api.models import AtRiskSurvivor, ReportCluster, SuspiciousReporter
+from api.service.events.broadcast import broadcast
+
+
+class ReportGraph:
+    """In-memory index of the reporter -> reported infection report graph.
+
+    Reports are never deleted and survivors are never cured, so every
+    structure here only grows and is updated in place as reports come in:
+
+    * reporters and targets of every survivor (both edge directions),
+    * healthy survivors bucketed by how many reports they received,
+    * weakly connected clusters, kept by a union-find that merges the
+      smaller member set into the larger one,
+    * per reporter, how many of its targets ended up infected.
+    """
+
+    def __init__(self):
+        self.reporters: Dict[int, Set[int]] = defaultdict(set)
+        self.targets: Dict[int, Set[int]] = defaultdict(set)
+        self.infected: Set[int] = set()
+        self.by_reports: Dict[int, Set[int]] = defaultdict(set)
+        self.confirmed: Dict[int, int] = defaultdict(int)
+        self._parent: Dict[int, int] = {}
+        self._members: Dict[int, Set[int]] = {}
+        self._edges: Dict[int, int] = {}
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _find(self, survivor_id: int) -> int:
+        parent = self._parent.setdefault(survivor_id, survivor_id)
+        if parent == survivor_id:
+            self._members.setdefault(survivor_id, {survivor_id})
+            self._edges.setdefault(survivor_id, 0)
+            return survivor_id
+        root = self._find(parent)
+        self._parent[survivor_id] = root
+        return root
+
+    def _union(self, a: int, b: int) -> int:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return root_a
+        if len(self._members[root_a]) < len(self._members[root_b]):
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._members[root_a] |= self._members.pop(root_b)
+        self._edges[root_a] += self._edges.pop(root_b)
+        return root_a
+
+    def add_report(self, reporter_id: int, reported_id: int) -> None:
+        if reporter_id in self.reporters[reported_id]:
+            return
+        count = len(self.reporters[reported_id])
+        self.reporters[reported_id].add(reporter_id)
+        self.targets[reporter_id].add(reported_id)
+        if reported_id in self.infected:
+            self.confirmed[reporter_id] += 1
+        else:
+            self.by_reports[count].discard(reported_id)
+            self.by_reports[count + 1].add(reported_id)
+        self._edges[self._union(reporter_id, reported_id)] += 1
+
+    def mark_infected(self, survivor_ids: Iterable[int]) -> None:
+        for survivor_id in survivor_ids:
+            if survivor_id in self.infected:
+                continue
+            self.infected.add(survivor_id)
+            reporters = self.reporters.get(survivor_id, ())
+            self.by_reports[len(reporters)].discard(survivor_id)
+            for reporter_id in reporters:
+                self.confirmed[reporter_id] += 1
+
+    def at_risk(self, threshold: int) -> List[AtRiskSurvivor]:
+        """Healthy survivors one report away from ``threshold``."""
+        if threshold < 2:
+            return []
+        return [
+            AtRiskSurvivor(
+                id=survivor_id, reporters=sorted(self.reporters[survivor_id])
+            )
+            for survivor_id in sorted(self.by_reports.get(threshold - 1, ()))
+        ]
+
+    def clusters(self, min_size: int, limit: int) -> List[ReportCluster]:
+        """Largest groups of survivors linked by reports, in either direction."""
+        roots = [
+            root
+            for root, members in self._members.items()
+            if len(members) >= min_size
+        ]
+        roots.sort(key=lambda root: (-len(self._members[root]), root))
+        return [
+            ReportCluster(
+                size=len(self._members[root]),
+                reports=self._edges[root],
+                infected=len(self._members[root] & self.infected),
+                survivors=sorted(self._members[root]),
+            )
+            for root in roots[:limit]
+        ]
+
+    def suspicious_reporters(
+        self, min_reports: int, max_confirmation_rate: float, limit: int
+    ) -> List[SuspiciousReporter]:
+        """Reporters whose targets rarely turn out to be infected."""
+        suspects = []
+        for reporter_id, targets in self.targets.items():
+            if len(targets) < min_reports:
+                continue
+            rate = self.confirmed[reporter_id] / len(targets)
+            if rate <= max_confirmation_rate:
+                suspects.append(
+                    SuspiciousReporter(
+                        reporter_id=reporter_id,
+                        reports=len(targets),
+                        confirmed=self.confirmed[reporter_id],
+                        confirmation_rate=rate,
+                    )
+                )
+        suspects.sort(key=lambda s: (s.confirmation_rate, -s.reports, s.reporter_id))
+        return suspects[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "reports": sum(self._edges.values()),
+            "clusters": len(self._members),
+        }
+
+
+report_graph = ReportGraph()
+
+
+def _apply(reports: Iterable[Tuple[int, int]], infected: Iterable[int]) -> None:
+    for reporter_id, reported_id in reports:
+        report_graph.add_report(reporter_id, reported_id)
+    report_graph.mark_infected(infected)
+
+
+def record_reports(
+    reports: List[Tuple[int, int]], newly_infected: List[int]
+) -> None:
+    """Add committed (reporter, reported) pairs here and in the other workers."""
+    _apply(reports, newly_infected)
+    if reports or newly_infected:
+        broadcast.publish(
+            "report_graph.reports", reports=reports, infected=newly_infected
+        )
+
+
+broadcast.on(
+    "report_graph.reports", lambda data: _apply(data["reports"], data["infected"])
+)
+
+
+async def load_report_graph(db: AsyncSession) -> None:
+    """Build the index from ``infection_reports`` once, on startup."""
+    report_graph.clear()
+    infected = await db.execute(
+        select(SurvivorModel.id).where(SurvivorModel.infected.is_(True))
+    )
+    report_graph.mark_infected(infected.scalars())
+    result = await db.execute(
+        select(infection_reports.c.reporter_id, infection_reports.c.reported_id)
+    )
+    for row in result:
+        report_graph.add_report(row.reporter_id, row.reported_id)
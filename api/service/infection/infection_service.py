@@ -1,78 +1,237 @@
+from typing import List
+
 from fastapi import HTTPException
-from sqlalchemy import and_, func, select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.database import SurvivorModel, infection_reports
-from api.models import ReportInfection
-from api.service.survivors.survivor_service import get_survivor_by_id
+from api.database import SurvivorModel, dialect_insert, infection_reports
+from api.models import (
+    InfectionReport,
+    RejectedReport,
+    ReportBatchResult,
+    ReportInfection,
+)
+from api.service.cache.survivor_cache import survivor_cache
+from api.service.events.change_feed import change_feed
+from api.service.graph.report_graph import record_reports
+from api.service.reports.reports_service import record_infections
+from api.service.survivors.survivor_service import Projection, get_survivors_by_ids
+
+INFECTION_THRESHOLD = 3
+MAX_REPORT_BATCH = 5000
 
 
 async def report_infection(
     survivor_id: int, report: ReportInfection, db: AsyncSession
 ) -> dict:
+    """Record an infection report and flip ``infected`` in the same transaction.
+
+    ``report_count`` is incremented atomically and read back by the same
+    UPDATE, so concurrent reports cannot both miss the third one. Only the
+    request whose guarded UPDATE actually flips ``infected`` moves the
+    survivor to the infected population totals.
+    """
     if survivor_id == report.reporter_id:
         raise HTTPException(
             status_code=400,
             detail="Cannot report self as infected"
         )
 
-    survivor = await get_survivor_by_id(survivor_id, db)
-    if not survivor:
+    survivors = await get_survivors_by_ids(
+        [survivor_id, report.reporter_id], db, Projection.status
+    )
+    infected = {i: survivor["infected"] for i, survivor in survivors.items()}
+
+    if survivor_id not in infected:
         raise HTTPException(status_code=404, detail="Survivor not found")
 
-    if survivor.infected:
+    if infected[survivor_id]:
         raise HTTPException(status_code=400, detail="Survivor is already infected")
 
-    reporter = await get_survivor_by_id(report.reporter_id, db)
-    if not reporter:
+    if report.reporter_id not in infected:
         raise HTTPException(status_code=404, detail="Reporter not found")
-    if reporter.infected:
+    if infected[report.reporter_id]:
         raise HTTPException(
             status_code=400, detail="Infected survivors cannot report others"
         )
 
-    existing_report = await db.execute(
-        select(infection_reports).where(
-            and_(
-                infection_reports.c.reporter_id == report.reporter_id,
-                infection_reports.c.reported_id == survivor_id,
-            )
+    try:
+        inserted = await db.execute(
+            dialect_insert(db)(infection_reports)
+            .values(reporter_id=report.reporter_id, reported_id=survivor_id)
+            .on_conflict_do_nothing()
+            .returning(infection_reports.c.reporter_id)
         )
-    )
-    if existing_report.first():
+        if inserted.first() is None:
+            await db.rollback()
+            already_reported = True
+        else:
+            already_reported = False
+            newly_infected = []
+            counted = await db.execute(
+                update(SurvivorModel)
+                .where(SurvivorModel.id == survivor_id)
+                .values(report_count=SurvivorModel.report_count + 1)
+                .returning(SurvivorModel.report_count)
+            )
+            total_reports = counted.scalar_one()
+            now_infected = total_reports >= INFECTION_THRESHOLD
+            if now_infected:
+                flipped = await db.execute(
+                    update(SurvivorModel)
+                    .where(
+                        SurvivorModel.id == survivor_id,
+                        SurvivorModel.infected.is_(False),
+                    )
+                    .values(infected=True, version=SurvivorModel.version + 1)
+                    .returning(SurvivorModel.id)
+                )
+                newly_infected = flipped.scalars().all()
+                await record_infections(newly_infected, db)
+            await db.commit()
+
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to report infection: {str(e)}"
+        ) from e
+
+    if already_reported:
         raise HTTPException(
             status_code=400, detail="You have already reported this survivor"
         )
 
+    await survivor_cache.invalidate([survivor_id])
+    record_reports([(report.reporter_id, survivor_id)], newly_infected)
+    change_feed.publish(
+        "survivor.reported", id=survivor_id, reporter_id=report.reporter_id
+    )
+    if newly_infected:
+        change_feed.publish("survivor.infected", id=survivor_id)
+    if now_infected:
+        return {"message": "Survivor has been marked as infected"}
+
+    return {"message": f"Infection report recorded. Total reports: {total_reports}"}
+
+
+async def report_infections_batch(
+    reports: List[InfectionReport], db: AsyncSession
+) -> ReportBatchResult:
+    """Ingest many infection reports with a fixed number of set-based queries.
+
+    Reports are checked against one snapshot of the involved survivors and of
+    their existing reports, the valid ones are inserted in bulk and the report
+    counts of every affected survivor are recomputed in a single UPDATE.
+    """
+    survivor_ids = {r.reporter_id for r in reports} | {r.reported_id for r in reports}
+    survivors = await get_survivors_by_ids(survivor_ids, db, Projection.status)
+    infected = {i: survivor["infected"] for i, survivor in survivors.items()}
+
+    result = await db.execute(
+        select(infection_reports.c.reporter_id, infection_reports.c.reported_id).where(
+            infection_reports.c.reporter_id.in_({r.reporter_id for r in reports}),
+            infection_reports.c.reported_id.in_({r.reported_id for r in reports}),
+        )
+    )
+    seen = {(row.reporter_id, row.reported_id) for row in result}
+
+    candidates, rejected = [], []
+    for report in reports:
+        pair = (report.reporter_id, report.reported_id)
+        reason = None
+        if report.reporter_id == report.reported_id:
+            reason = "Cannot report self as infected"
+        elif report.reported_id not in infected:
+            reason = "Survivor not found"
+        elif infected[report.reported_id]:
+            reason = "Survivor is already infected"
+        elif report.reporter_id not in infected:
+            reason = "Reporter not found"
+        elif infected[report.reporter_id]:
+            reason = "Infected survivors cannot report others"
+        elif pair in seen:
+            reason = "You have already reported this survivor"
+
+        if reason:
+            rejected.append(RejectedReport(**report.model_dump(), reason=reason))
+        else:
+            seen.add(pair)
+            candidates.append(report)
+
+    if not candidates:
+        return ReportBatchResult(accepted=[], rejected=rejected, newly_infected=[])
+
     try:
-        await db.execute(
-            infection_reports.insert().values(
-                reporter_id=report.reporter_id, reported_id=survivor_id
+        inserted = await db.execute(
+            dialect_insert(db)(infection_reports)
+            .values([report.model_dump() for report in candidates])
+            .on_conflict_do_nothing()
+            .returning(
+                infection_reports.c.reporter_id, infection_reports.c.reported_id
             )
         )
-        await db.commit()
+        inserted_pairs = {(row.reporter_id, row.reported_id) for row in inserted}
+        targets = {reported_id for _, reported_id in inserted_pairs}
 
-        report_count = await db.execute(
+        report_count = (
             select(func.count())
             .select_from(infection_reports)
-            .where(infection_reports.c.reported_id == survivor_id)
+            .where(infection_reports.c.reported_id == SurvivorModel.id)
+            .scalar_subquery()
         )
-        total_reports = report_count.scalar()
-
-        if total_reports >= 3:
-            await db.execute(
-                update(SurvivorModel)
-                .where(SurvivorModel.id == survivor_id)
-                .values(infected=True)
+        await db.execute(
+            update(SurvivorModel)
+            .where(SurvivorModel.id.in_(targets))
+            .values(report_count=report_count)
+        )
+        flipped = await db.execute(
+            update(SurvivorModel)
+            .where(
+                SurvivorModel.id.in_(targets),
+                SurvivorModel.report_count >= INFECTION_THRESHOLD,
+                SurvivorModel.infected.is_(False),
             )
-            await db.commit()
-            return {"message": "Survivor has been marked as infected"}
-
-        return {"message": f"Infection report recorded. Total reports: {total_reports}"}
+            .values(infected=True, version=SurvivorModel.version + 1)
+            .returning(SurvivorModel.id)
+        )
+        newly_infected = sorted(flipped.scalars().all())
+        await record_infections(newly_infected, db)
+        await db.commit()
 
     except Exception as e:
         await db.rollback()
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to report infection: {str(e)}"
+            detail=f"Failed to report infections: {str(e)}"
         ) from e
+
+    await survivor_cache.invalidate(targets)
+
+    accepted = []
+    for report in candidates:
+        if (report.reporter_id, report.reported_id) in inserted_pairs:
+            accepted.append(report)
+            change_feed.publish(
+                "survivor.reported",
+                id=report.reported_id,
+                reporter_id=report.reporter_id,
+            )
+        else:
+            rejected.append(
+                RejectedReport(
+                    **report.model_dump(),
+                    reason="You have already reported this survivor",
+                )
+            )
+
+    record_reports(
+        [(report.reporter_id, report.reported_id) for report in accepted],
+        newly_infected,
+    )
+    for survivor_id in newly_infected:
+        change_feed.publish("survivor.infected", id=survivor_id)
+
+    return ReportBatchResult(
+        accepted=accepted, rejected=rejected, newly_infected=newly_infected
+    )
@@ -1,38 +1,276 @@
-from sqlalchemy import select
+from typing import Dict, Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.database import ItemModel, ItemType, survivor_items
+from api.database import (
+    INVENTORY_LAYOUT_KEY,
+    ItemType,
+    SurvivorModel,
+    app_metadata,
+    dialect_insert,
+    inventories,
+    survivor_items,
+    uses_compact_inventory,
+)
+from api.service.inventory.item_catalog import get_item_catalog
 
+ITEM_COLUMNS = [item_type.value for item_type in ItemType]
+# Keeps multi-row VALUES statements under SQLite's bound parameter limit.
+INSERT_CHUNK_SIZE = 500
 
-async def get_survivor_inventory(survivor_id: int, db: AsyncSession) -> dict:
-    result = await db.execute(
-        select(ItemModel.name, survivor_items.c.quantity)
-        .join(survivor_items, ItemModel.id == survivor_items.c.item_id)
-        .where(survivor_items.c.survivor_id == survivor_id)
-    )
 
-    inventory = {
+def empty_inventory() -> dict:
+    return {
         ItemType.water.value: 0,
         ItemType.food.value: 0,
         ItemType.medication.value: 0,
         ItemType.ammunition.value: 0,
     }
 
+
+async def get_survivor_inventory(survivor_id: int, db: AsyncSession) -> dict:
+    if uses_compact_inventory():
+        return (await get_inventories([survivor_id], db))[survivor_id]
+
+    catalog = await get_item_catalog(db)
+    result = await db.execute(
+        select(survivor_items.c.item_id, survivor_items.c.quantity).where(
+            survivor_items.c.survivor_id == survivor_id
+        )
+    )
+
+    inventory = empty_inventory()
+
     for row in result:
-        inventory[row.name.value] = row.quantity
+        inventory[catalog.types[row.item_id].value] = row.quantity
 
     return inventory
 
 
+async def get_inventories(
+    survivor_ids: Iterable[int], db: AsyncSession
+) -> Dict[int, dict]:
+    """Load the inventories of several survivors with a single query."""
+    ids = list(survivor_ids)
+    result_map = {survivor_id: empty_inventory() for survivor_id in ids}
+    if not ids:
+        return result_map
+
+    if uses_compact_inventory():
+        result = await db.execute(
+            select(inventories).where(inventories.c.survivor_id.in_(ids))
+        )
+        for row in result.mappings():
+            result_map[row["survivor_id"]] = {
+                column: row[column] for column in ITEM_COLUMNS
+            }
+        return result_map
+
+    catalog = await get_item_catalog(db)
+    result = await db.execute(
+        select(
+            survivor_items.c.survivor_id,
+            survivor_items.c.item_id,
+            survivor_items.c.quantity,
+        ).where(survivor_items.c.survivor_id.in_(ids))
+    )
+
+    for row in result:
+        result_map[row.survivor_id][catalog.types[row.item_id].value] = row.quantity
+
+    return result_map
+
+
 async def add_inventory_items(survivor_id: int, items: dict, db: AsyncSession) -> None:
-    items_result = await db.execute(select(ItemModel))
-    items_db = {item.name: item for item in items_result.scalars().all()}
-
-    for item_type, quantity in items.items():
-        if quantity > 0:
-            item = items_db[ItemType[item_type]]
-            await db.execute(
-                survivor_items.insert().values(
-                    survivor_id=survivor_id, item_id=item.id, quantity=quantity
+    await add_inventories({survivor_id: items}, db)
+
+
+async def add_inventories(items_by_survivor: Dict[int, dict], db: AsyncSession) -> None:
+    """Insert the starting inventories of newly created survivors in bulk."""
+    if uses_compact_inventory():
+        rows = [
+            {
+                "survivor_id": survivor_id,
+                **{column: items.get(column, 0) for column in ITEM_COLUMNS},
+            }
+            for survivor_id, items in items_by_survivor.items()
+        ]
+    else:
+        catalog = await get_item_catalog(db)
+        rows = [
+            {
+                "survivor_id": survivor_id,
+                "item_id": catalog.item_id(item_type),
+                "quantity": quantity,
+            }
+            for survivor_id, items in items_by_survivor.items()
+            for item_type, quantity in items.items()
+            if quantity > 0
+        ]
+
+    table = inventories if uses_compact_inventory() else survivor_items
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await db.execute(
+            table.insert().values(rows[start:start + INSERT_CHUNK_SIZE])
+        )
+
+
+async def apply_inventory_deltas(deltas: Dict[int, dict], db: AsyncSession) -> None:
+    """Add signed per-item quantity changes to several inventories at once.
+
+    All changes go out as one ``INSERT ... ON CONFLICT DO UPDATE`` whose update
+    only applies while the resulting quantity stays non-negative. If any row
+    is refused, or a negative change lands on a row that did not exist, the
+    inventory changed underneath the caller and the whole change is rejected;
+    the caller rolls back.
+    """
+    if uses_compact_inventory():
+        rows = [
+            {
+                "survivor_id": survivor_id,
+                **{column: items.get(column, 0) for column in ITEM_COLUMNS},
+            }
+            for survivor_id, items in deltas.items()
+            if any(items.values())
+        ]
+        if not rows:
+            return
+
+        stmt = dialect_insert(db)(inventories).values(rows)
+        new_values = {
+            column: inventories.c[column] + stmt.excluded[column]
+            for column in ITEM_COLUMNS
+        }
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[inventories.c.survivor_id],
+            set_=new_values,
+            where=and_(*(value >= 0 for value in new_values.values())),
+        ).returning(*(inventories.c[column] for column in ITEM_COLUMNS))
+    else:
+        catalog = await get_item_catalog(db)
+        rows = [
+            {
+                "survivor_id": survivor_id,
+                "item_id": catalog.item_id(item_type),
+                "quantity": delta,
+            }
+            for survivor_id, items in deltas.items()
+            for item_type, delta in items.items()
+            if delta != 0
+        ]
+        if not rows:
+            return
+
+        stmt = dialect_insert(db)(survivor_items).values(rows)
+        new_quantity = survivor_items.c.quantity + stmt.excluded.quantity
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[survivor_items.c.survivor_id, survivor_items.c.item_id],
+            set_={"quantity": new_quantity},
+            where=new_quantity >= 0,
+        ).returning(survivor_items.c.quantity)
+
+    written = (await db.execute(stmt)).all()
+    if len(written) != len(rows) or any(min(row) < 0 for row in written):
+        raise HTTPException(
+            status_code=409, detail="Inventory changed concurrently, please retry"
+        )
+
+
+async def migrate_to_compact_inventories(db: AsyncSession) -> int:
+    """Rebuild ``inventories`` from ``survivor_items`` with one INSERT ... SELECT.
+
+    Every survivor gets a row, including those without any items. Returns the
+    number of rows written. The caller commits.
+    """
+    catalog = await get_item_catalog(db)
+    quantities = [
+        func.coalesce(
+            func.sum(
+                case(
+                    (
+                        survivor_items.c.item_id == catalog.ids[item_type],
+                        survivor_items.c.quantity,
+                    ),
+                    else_=0,
                 )
+            ),
+            0,
+        )
+        for item_type in ItemType
+    ]
+    source = (
+        select(SurvivorModel.id, *quantities)
+        .select_from(SurvivorModel)
+        .outerjoin(survivor_items, survivor_items.c.survivor_id == SurvivorModel.id)
+        .group_by(SurvivorModel.id)
+    )
+
+    await db.execute(delete(inventories))
+    result = await db.execute(
+        insert(inventories).from_select(["survivor_id", *ITEM_COLUMNS], source)
+    )
+    return result.rowcount
+
+
+async def migrate_to_item_inventories(db: AsyncSession) -> int:
+    """Rebuild ``survivor_items`` from ``inventories``, one INSERT ... SELECT per item.
+
+    Like the item write paths, only positive quantities get a row. Returns the
+    number of rows written. The caller commits.
+    """
+    catalog = await get_item_catalog(db)
+    await db.execute(delete(survivor_items))
+    written = 0
+    for item_type in ItemType:
+        quantity = inventories.c[item_type.value]
+        result = await db.execute(
+            insert(survivor_items).from_select(
+                ["survivor_id", "item_id", "quantity"],
+                select(
+                    inventories.c.survivor_id,
+                    literal(catalog.ids[item_type]),
+                    quantity,
+                ).where(quantity > 0),
             )
+        )
+        written += result.rowcount
+    return written
+
+
+async def ensure_inventory_layout(db: AsyncSession) -> None:
+    """Make the configured layout hold the current inventories.
+
+    ``app_metadata`` records which layout the write paths last used. When
+    ``INVENTORY_LAYOUT`` differs from it, the configured table is rebuilt
+    from the other one before serving. Databases from before the layout was
+    recorded are assumed to be current, except for an empty ``inventories``
+    in compact mode, which is filled.
+    """
+    layout = "compact" if uses_compact_inventory() else "items"
+    recorded = await db.scalar(
+        select(app_metadata.c.value).where(app_metadata.c.key == INVENTORY_LAYOUT_KEY)
+    )
+    if recorded == layout:
+        return
+
+    if recorded is None:
+        has_rows = await db.scalar(select(exists().select_from(inventories)))
+        has_survivors = await db.scalar(select(exists().select_from(SurvivorModel)))
+        if layout == "compact" and has_survivors and not has_rows:
+            await migrate_to_compact_inventories(db)
+    elif layout == "compact":
+        await migrate_to_compact_inventories(db)
+    else:
+        await migrate_to_item_inventories(db)
+
+    stmt = dialect_insert(db)(app_metadata).values(
+        key=INVENTORY_LAYOUT_KEY, value=layout
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[app_metadata.c.key], set_={"value": layout}
+        )
+    )
+    await db.commit()
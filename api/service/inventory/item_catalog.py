@@ -0,0 +1,41 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import ItemModel, ItemType
+
+
+class ItemCatalog:
+    """Snapshot of the fixed ``items`` table, keyed both ways."""
+
+    def __init__(self, rows: Sequence[Row]):
+        self.ids = {ItemType(row.name): row.id for row in rows}
+        self.points = {ItemType(row.name): row.points for row in rows}
+        self.types = {row.id: ItemType(row.name) for row in rows}
+
+    def item_id(self, item_type: str) -> int:
+        return self.ids[ItemType(item_type)]
+
+
+_catalog: Optional[ItemCatalog] = None
+
+
+async def load_item_catalog(db: AsyncSession) -> ItemCatalog:
+    global _catalog
+    result = await db.execute(select(ItemModel.id, ItemModel.name, ItemModel.points))
+    _catalog = ItemCatalog(result.all())
+    return _catalog
+
+
+async def get_item_catalog(db: AsyncSession) -> ItemCatalog:
+    """Return the cached catalog, loading it on first use."""
+    if _catalog is None:
+        return await load_item_catalog(db)
+    return _catalog
+
+
+def invalidate_item_catalog() -> None:
+    """Drop the cached catalog, e.g. after the items table was reseeded."""
+    global _catalog
+    _catalog = None
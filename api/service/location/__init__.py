@@ -0,0 +1,3 @@
+"""
+ZSSN API location service package
+"""
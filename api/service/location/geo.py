@@ -0,0 +1,65 @@
+import math
+from typing import List, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+
+# Survivors are bucketed into a fixed grid of CELL_SIZE x CELL_SIZE degree cells.
+# A cell id is row * CELL_COLUMNS + column, so each grid row is a contiguous id
+# range and a bounding box maps onto a few B-tree range scans.
+CELL_SIZE = 0.1
+CELL_ROWS = round(180 / CELL_SIZE)
+CELL_COLUMNS = round(360 / CELL_SIZE)
+
+
+def _row(latitude: float) -> int:
+    return min(CELL_ROWS - 1, max(0, math.floor((latitude + 90) / CELL_SIZE)))
+
+
+def _column(longitude: float) -> int:
+    return math.floor((longitude + 180) / CELL_SIZE) % CELL_COLUMNS
+
+
+def geocell(latitude: float, longitude: float) -> int:
+    return _row(latitude) * CELL_COLUMNS + _column(longitude)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geocell_ranges(
+    latitude: float, longitude: float, radius_km: float
+) -> List[Tuple[int, int]]:
+    """Return inclusive cell id ranges covering a circle's bounding box."""
+    d_lat = radius_km / KM_PER_DEGREE
+    lat_min, lat_max = latitude - d_lat, latitude + d_lat
+    widest = max(abs(lat_min), abs(lat_max))
+    cos_lat = math.cos(math.radians(min(widest, 90.0)))
+    d_lon = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+
+    if lat_min <= -90 or lat_max >= 90 or d_lon >= 180:
+        columns = [(0, CELL_COLUMNS - 1)]
+    else:
+        first, last = _column(longitude - d_lon), _column(longitude + d_lon)
+        if first <= last:
+            columns = [(first, last)]
+        else:
+            columns = [(0, last), (first, CELL_COLUMNS - 1)]
+
+    ranges = []
+    for row in range(_row(lat_min), _row(lat_max) + 1):
+        for first, last in columns:
+            start, end = row * CELL_COLUMNS + first, row * CELL_COLUMNS + last
+            if ranges and ranges[-1][1] + 1 >= start:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+    return sorted(ranges)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from api.database import AsyncSessionLocal
+from api.models import Location, LocationUpdate
+from api.service.survivors.survivor_service import update_locations
+
+logger = logging.getLogger(__name__)
+
+# "direct" writes every location update immediately, "buffered" coalesces them.
+LOCATION_INGEST_MODE = os.getenv("LOCATION_INGEST_MODE", "direct")
+LOCATION_FLUSH_INTERVAL = float(os.getenv("LOCATION_FLUSH_INTERVAL", "1.0"))
+LOCATION_MAX_PENDING = int(os.getenv("LOCATION_MAX_PENDING", "10000"))
+MAX_LOCATION_BATCH = 5000
+
+
+def uses_buffered_locations() -> bool:
+    return LOCATION_INGEST_MODE == "buffered"
+
+
+class LocationBuffer:
+    """Coalesce location pings in memory and write them in periodic batches.
+
+    Only the latest position per survivor is kept. A background task flushes
+    the buffer every ``flush_interval`` seconds, or sooner once
+    ``max_pending`` survivors are waiting, so a position is never more than
+    about one interval stale. ``stop`` always performs a final flush.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        flush_interval: float = LOCATION_FLUSH_INTERVAL,
+        max_pending: int = LOCATION_MAX_PENDING,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Location] = {}
+        # Created lazily so they bind to the running event loop.
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.unmatched_rows = 0
+        self.failed_flushes = 0
+        self.last_flush_seconds = 0.0
+        self.last_flush_at: Optional[float] = None
+
+    def put(self, survivor_id: int, location: Location) -> None:
+        self.received += 1
+        if survivor_id in self._pending:
+            self.coalesced += 1
+        self._pending[survivor_id] = location
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def put_many(self, updates: List[LocationUpdate]) -> None:
+        for update in updates:
+            self.put(
+                update.survivor_id,
+                Location(latitude=update.latitude, longitude=update.longitude),
+            )
+
+    async def flush(self) -> int:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as session:
+                    matched = await update_locations(pending, session)
+            except Exception:
+                self.failed_flushes += 1
+                # Keep newer pings that arrived while the flush was running.
+                self._pending = {**pending, **self._pending}
+                logger.exception("Failed to flush %d location updates", len(pending))
+                raise
+
+            self.flushes += 1
+            self.flushed_rows += matched
+            self.unmatched_rows += len(pending) - matched
+            self.last_flush_seconds = time.perf_counter() - start
+            self.last_flush_at = time.time()
+            return matched
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged; the updates stay buffered for the next round.
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "mode": LOCATION_INGEST_MODE,
+            "pending": len(self._pending),
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "unmatched_rows": self.unmatched_rows,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_flush_at": self.last_flush_at,
+            "flush_interval": self.flush_interval,
+        }
+
+
+location_buffer = LocationBuffer()
@@ -0,0 +1,46 @@
+from typing import List
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import SurvivorModel
+from api.models import NearbySurvivor
+from api.service.location.geo import geocell_ranges, haversine_km
+from api.service.survivors.survivor_service import build_survivors, survivor_columns
+
+DEFAULT_NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 200
+MAX_RADIUS_KM = 500.0
+
+
+async def get_nearby_survivors(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    db: AsyncSession,
+    limit: int = DEFAULT_NEARBY_LIMIT,
+) -> List[NearbySurvivor]:
+    """Return survivors within ``radius_km``, nearest first.
+
+    Candidates come from index range scans over the grid cells covering the
+    search circle; the exact haversine distance then filters and orders them.
+    """
+    cells = [
+        SurvivorModel.geocell.between(start, end)
+        for start, end in geocell_ranges(latitude, longitude, radius_km)
+    ]
+    result = await db.execute(survivor_columns().where(or_(*cells)))
+
+    nearby = []
+    for row in result:
+        distance = haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            nearby.append((distance, row))
+    nearby.sort(key=lambda candidate: (candidate[0], candidate[1].id))
+    nearby = nearby[:limit]
+
+    survivors = await build_survivors([row for _, row in nearby], db)
+    return [
+        NearbySurvivor(**survivor.model_dump(), distance_km=round(distance, 3))
+        for (distance, _), survivor in zip(nearby, survivors)
+    ]
@@ -0,0 +1,3 @@
+"""
+ZSSN API offers service package
+"""
@@ -0,0 +1,327 @@
+import os
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import ItemType, trade_offers
+from api.models import (
+    Inventory,
+    Offer,
+    OfferCreate,
+    OfferFill,
+    OfferResult,
+    Trade,
+    TradeItem,
+)
+from api.service.events.broadcast import broadcast
+from api.service.offers.order_book import OpenOffer, OrderBook, exchange_unit
+from api.service.survivors.survivor_service import Projection, get_survivors_by_ids
+from api.service.trading.trading_service import (
+    announce_trade,
+    retry_on_conflict,
+    settle_trade,
+)
+
+# Upper bound on the counter offers one new offer is matched against.
+MAX_FILLS_PER_OFFER = int(os.getenv("MAX_FILLS_PER_OFFER", "100"))
+DEFAULT_OFFER_LIMIT = 100
+MAX_OFFER_LIMIT = 1000
+
+order_book = OrderBook()
+
+
+def _to_offer(offer: OpenOffer, posted_units: int, status: str) -> Offer:
+    """Describe ``offer`` as posted, with what is left of it."""
+    give_unit, want_unit = exchange_unit(offer.give, offer.want)
+    return Offer(
+        id=offer.id,
+        survivor_id=offer.survivor_id,
+        give_item=offer.give.value,
+        give_quantity=posted_units * give_unit,
+        want_item=offer.want.value,
+        want_quantity=posted_units * want_unit,
+        remaining_give_quantity=offer.give_quantity,
+        remaining_want_quantity=offer.want_quantity,
+        status=status,
+    )
+
+
+def _from_row(row) -> OpenOffer:
+    return OpenOffer(
+        id=row.id,
+        survivor_id=row.survivor_id,
+        give=ItemType(row.give_item),
+        want=ItemType(row.want_item),
+        units=row.units,
+    )
+
+
+def _add_to_book(offer: OpenOffer) -> None:
+    order_book.add(offer)
+    broadcast.publish(
+        "order_book.add",
+        id=offer.id,
+        survivor_id=offer.survivor_id,
+        give=offer.give.value,
+        want=offer.want.value,
+        units=offer.units,
+    )
+
+
+def _apply_units(offer_id: int, units: int) -> None:
+    offer = order_book.get(offer_id)
+    if units == 0:
+        order_book.remove(offer_id)
+    elif offer is not None:
+        offer.units = units
+
+
+def _set_units(offer_id: int, units: int) -> None:
+    """Record what is left of an offer here and in the other workers' books."""
+    _apply_units(offer_id, units)
+    broadcast.publish("order_book.units", id=offer_id, units=units)
+
+
+def _on_add(data: dict) -> None:
+    order_book.add(
+        OpenOffer(
+            data["id"],
+            data["survivor_id"],
+            ItemType(data["give"]),
+            ItemType(data["want"]),
+            data["units"],
+        )
+    )
+
+
+broadcast.on("order_book.add", _on_add)
+broadcast.on("order_book.units", lambda data: _apply_units(data["id"], data["units"]))
+
+
+async def load_order_book(db: AsyncSession) -> None:
+    """Rebuild the in-memory order book from the open offers."""
+    result = await db.execute(
+        select(trade_offers).where(trade_offers.c.status == "open")
+    )
+    order_book.clear()
+    for row in result:
+        order_book.add(_from_row(row))
+
+
+async def _can_give(
+    survivor_id: int, item: ItemType, quantity: int, db: AsyncSession
+) -> bool:
+    survivors = await get_survivors_by_ids([survivor_id], db, Projection.inventory)
+    survivor = survivors.get(survivor_id)
+    if survivor is None:
+        raise HTTPException(status_code=404, detail="Survivor not found")
+    return not survivor["infected"] and survivor["inventory"][item.value] >= quantity
+
+
+async def _fill(offer_id: int, units: int, db: AsyncSession) -> None:
+    """Take ``units`` from an open offer, closing it once nothing is left."""
+    remaining = trade_offers.c.units - units
+    result = await db.execute(
+        update(trade_offers)
+        .where(
+            trade_offers.c.id == offer_id,
+            trade_offers.c.status == "open",
+            trade_offers.c.units >= units,
+        )
+        .values(
+            units=remaining,
+            status=case((remaining == 0, "filled"), else_=trade_offers.c.status),
+        )
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=409, detail="Offer changed concurrently, please retry"
+        )
+
+
+async def _close(offer_id: int, status: str, db: AsyncSession) -> None:
+    """Close an open offer; drop it from the books once the caller commits."""
+    await db.execute(
+        update(trade_offers)
+        .where(trade_offers.c.id == offer_id, trade_offers.c.status == "open")
+        .values(status=status)
+    )
+
+
+async def _refresh(offer_id: int, db: AsyncSession) -> None:
+    """Bring a book entry back in line with its row after a lost race."""
+    async with db.begin():
+        row = (
+            await db.execute(select(trade_offers).where(trade_offers.c.id == offer_id))
+        ).one_or_none()
+    offer = order_book.get(offer_id)
+    if row is None or row.status != "open":
+        order_book.remove(offer_id)
+    elif offer is not None:
+        offer.units = row.units
+
+
+async def _match(offer: OpenOffer, db: AsyncSession) -> List[OfferFill]:
+    """Trade ``offer`` against the oldest compatible offers until it is filled.
+
+    Every fill is an ordinary trade settled through the trading rules, in the
+    same transaction that takes the units from both offers. A counter offer
+    whose maker can no longer honour it is cancelled; if the new offer's own
+    maker cannot, matching stops and the offer stays open.
+    """
+    fills = []
+    give_unit, want_unit = exchange_unit(offer.give, offer.want)
+
+    for _ in range(MAX_FILLS_PER_OFFER):
+        counter = order_book.best_counter(offer)
+        if offer.units == 0 or counter is None:
+            break
+
+        units = min(offer.units, counter.units)
+        trade = Trade(
+            trader1=TradeItem(
+                survivor_id=offer.survivor_id,
+                items=Inventory(**{offer.give.value: units * give_unit}),
+            ),
+            trader2=TradeItem(
+                survivor_id=counter.survivor_id,
+                items=Inventory(**{offer.want.value: units * want_unit}),
+            ),
+        )
+
+        async def settle(trade=trade, counter=counter, units=units):
+            async with db.begin():
+                deltas = await settle_trade(trade, db)
+                await _fill(offer.id, units, db)
+                await _fill(counter.id, units, db)
+            return deltas
+
+        try:
+            deltas = await retry_on_conflict(settle)
+        except HTTPException as e:
+            if e.status_code == 409:
+                await _refresh(counter.id, db)
+                await _refresh(offer.id, db)
+                if order_book.get(offer.id) is None:
+                    break
+                continue
+            async with db.begin():
+                if not await _can_give(
+                    offer.survivor_id, offer.give, units * give_unit, db
+                ):
+                    break
+                await _close(counter.id, "cancelled", db)
+            _set_units(counter.id, 0)
+            continue
+
+        await announce_trade(deltas)
+        for filled in (offer, counter):
+            filled.units -= units
+            _set_units(filled.id, filled.units)
+        fills.append(
+            OfferFill(
+                counter_offer_id=counter.id,
+                counterparty_id=counter.survivor_id,
+                given=units * give_unit,
+                received=units * want_unit,
+            )
+        )
+
+    return fills
+
+
+async def create_offer(offer: OfferCreate, db: AsyncSession) -> OfferResult:
+    """Post a "give X for Y" offer and match it against the order book.
+
+    Both sides must be worth the same points, which makes the offer a whole
+    number of exchange units of its item pair. Whatever cannot be matched
+    right away stays in the book for later offers.
+    """
+    give, want = ItemType(offer.give_item), ItemType(offer.want_item)
+    if give == want:
+        raise HTTPException(
+            status_code=400, detail="Offer must give and want different items"
+        )
+    if offer.give_quantity * give.points != offer.want_quantity * want.points:
+        raise HTTPException(status_code=400, detail="Offer points must be equal")
+
+    async with db.begin():
+        survivors = await get_survivors_by_ids(
+            [offer.survivor_id], db, Projection.inventory
+        )
+        survivor = survivors.get(offer.survivor_id)
+        if survivor is None:
+            raise HTTPException(status_code=404, detail="Survivor not found")
+        if survivor["infected"]:
+            raise HTTPException(
+                status_code=400, detail="Infected survivors cannot trade"
+            )
+        if survivor["inventory"][give.value] < offer.give_quantity:
+            raise HTTPException(
+                status_code=400, detail=f"Survivor doesn't have enough {give.value}"
+            )
+
+        units = offer.give_quantity // exchange_unit(give, want)[0]
+        offer_id = (
+            await db.execute(
+                trade_offers.insert()
+                .values(
+                    survivor_id=offer.survivor_id,
+                    give_item=give.value,
+                    want_item=want.value,
+                    units=units,
+                    posted_units=units,
+                    status="open",
+                )
+                .returning(trade_offers.c.id)
+            )
+        ).scalar_one()
+
+    open_offer = OpenOffer(offer_id, offer.survivor_id, give, want, units)
+    _add_to_book(open_offer)
+    fills = await _match(open_offer, db)
+    status = "open" if order_book.get(offer_id) is not None else "filled"
+    return OfferResult(offer=_to_offer(open_offer, units, status), fills=fills)
+
+
+async def cancel_offer(offer_id: int, db: AsyncSession) -> Offer:
+    async with db.begin():
+        row = (
+            await db.execute(select(trade_offers).where(trade_offers.c.id == offer_id))
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        if row.status != "open":
+            raise HTTPException(
+                status_code=400, detail=f"Offer is already {row.status}"
+            )
+        await _close(offer_id, "cancelled", db)
+    _set_units(offer_id, 0)
+    return _to_offer(_from_row(row), row.posted_units, "cancelled")
+
+
+async def get_open_offers(
+    db: AsyncSession,
+    survivor_id: Optional[int] = None,
+    give_item: Optional[str] = None,
+    want_item: Optional[str] = None,
+    limit: int = DEFAULT_OFFER_LIMIT,
+) -> List[Offer]:
+    """Open offers, oldest first."""
+    query = (
+        select(trade_offers)
+        .where(trade_offers.c.status == "open")
+        .order_by(trade_offers.c.id)
+        .limit(limit)
+    )
+    if survivor_id is not None:
+        query = query.where(trade_offers.c.survivor_id == survivor_id)
+    if give_item is not None:
+        query = query.where(trade_offers.c.give_item == give_item)
+    if want_item is not None:
+        query = query.where(trade_offers.c.want_item == want_item)
+
+    result = await db.execute(query)
+    return [_to_offer(_from_row(row), row.posted_units, "open") for row in result]
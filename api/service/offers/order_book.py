@@ -0,0 +1,116 @@
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from api.database import ItemType
+
+
+def exchange_unit(give: ItemType, want: ItemType) -> Tuple[int, int]:
+    """Smallest quantities of ``give`` and ``want`` worth the same points.
+
+    Every equal-points exchange between the two items is a whole number of
+    these units, e.g. 3 water for 4 food.
+    """
+    points = math.lcm(give.points, want.points)
+    return points // give.points, points // want.points
+
+
+class OpenOffer:
+    """An offer as held by the order book, sized in exchange units."""
+
+    __slots__ = ("id", "survivor_id", "give", "want", "units")
+
+    def __init__(
+        self, id: int, survivor_id: int, give: ItemType, want: ItemType, units: int
+    ):
+        self.id = id
+        self.survivor_id = survivor_id
+        self.give = give
+        self.want = want
+        self.units = units
+
+    @property
+    def give_quantity(self) -> int:
+        return self.units * exchange_unit(self.give, self.want)[0]
+
+    @property
+    def want_quantity(self) -> int:
+        return self.units * exchange_unit(self.give, self.want)[1]
+
+
+class OrderBook:
+    """Open offers indexed by (item given, item wanted).
+
+    Offers on a pair trade whole exchange units at a fixed rate, so any offer
+    giving A for B matches any offer giving B for A and the books only need
+    time priority. Each book is a heap of offer ids (ids grow over time);
+    filled or cancelled offers are dropped lazily when they reach the top,
+    which keeps adding, removing and finding a counter offer logarithmic.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[Tuple[ItemType, ItemType], List[int]] = defaultdict(list)
+        self._open: Dict[Tuple[ItemType, ItemType], int] = defaultdict(int)
+        self._offers: Dict[int, OpenOffer] = {}
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def get(self, offer_id: int) -> Optional[OpenOffer]:
+        return self._offers.get(offer_id)
+
+    def add(self, offer: OpenOffer) -> None:
+        if offer.id in self._offers:
+            return
+        self._offers[offer.id] = offer
+        self._open[offer.give, offer.want] += 1
+        heapq.heappush(self._heaps[offer.give, offer.want], offer.id)
+
+    def remove(self, offer_id: int) -> Optional[OpenOffer]:
+        offer = self._offers.pop(offer_id, None)
+        if offer is not None:
+            pair = (offer.give, offer.want)
+            self._open[pair] -= 1
+            heap = self._heaps[pair]
+            # Stale ids below the top would otherwise pile up under churn.
+            if len(heap) > 2 * self._open[pair] + 64:
+                self._heaps[pair] = [i for i in heap if i in self._offers]
+                heapq.heapify(self._heaps[pair])
+        return offer
+
+    def best_counter(self, offer: OpenOffer) -> Optional[OpenOffer]:
+        """Oldest open offer giving what ``offer`` wants for what it gives.
+
+        Offers from the same survivor are skipped, never matched.
+        """
+        heap = self._heaps[offer.want, offer.give]
+        skipped = []
+        try:
+            while heap:
+                candidate = self._offers.get(heap[0])
+                if candidate is None:
+                    heapq.heappop(heap)
+                elif candidate.survivor_id == offer.survivor_id:
+                    skipped.append(heapq.heappop(heap))
+                else:
+                    return candidate
+            return None
+        finally:
+            for offer_id in skipped:
+                heapq.heappush(heap, offer_id)
+
+    def clear(self) -> None:
+        self._heaps.clear()
+        self._open.clear()
+        self._offers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "open_offers": len(self._offers),
+            "books": {
+                f"{give.value}->{want.value}": count
+                for (give, want), count in sorted(self._open.items())
+                if count
+            },
+        }
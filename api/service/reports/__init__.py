@@ -0,0 +1,3 @@
+"""
+ZSSN API reports service package
+"""
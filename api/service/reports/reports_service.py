@@ -0,0 +1,179 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import Select, case, delete, exists, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import (
+    ItemType,
+    SurvivorModel,
+    dialect_insert,
+    inventories,
+    population_stats,
+    survivor_items,
+    uses_compact_inventory,
+)
+from api.models import InfectionShare, Inventory, PointsLost, ResourceAverages
+from api.service.inventory.inventory_service import ITEM_COLUMNS, get_inventories
+from api.service.inventory.item_catalog import get_item_catalog
+
+STAT_COLUMNS = ["survivors", *ITEM_COLUMNS]
+
+
+def empty_stats() -> dict:
+    return {column: 0 for column in STAT_COLUMNS}
+
+
+async def population_totals_query(db: AsyncSession) -> Select:
+    """Aggregate survivor counts and item totals per infection status."""
+    if uses_compact_inventory():
+        holdings = inventories
+    else:
+        catalog = await get_item_catalog(db)
+        holdings = (
+            select(
+                survivor_items.c.survivor_id,
+                *(
+                    func.sum(
+                        case(
+                            (
+                                survivor_items.c.item_id == catalog.ids[item_type],
+                                survivor_items.c.quantity,
+                            ),
+                            else_=0,
+                        )
+                    ).label(item_type.value)
+                    for item_type in ItemType
+                ),
+            )
+            .group_by(survivor_items.c.survivor_id)
+            .subquery()
+        )
+
+    infected = func.coalesce(SurvivorModel.infected, False)
+    return (
+        select(
+            infected,
+            func.count(SurvivorModel.id),
+            *(func.coalesce(func.sum(holdings.c[c]), 0) for c in ITEM_COLUMNS),
+        )
+        .select_from(SurvivorModel)
+        .outerjoin(holdings, holdings.c.survivor_id == SurvivorModel.id)
+        .group_by(infected)
+    )
+
+
+async def compute_population_stats(db: AsyncSession) -> Dict[bool, dict]:
+    """Recompute the summary from scratch with one aggregate query."""
+    stats = {False: empty_stats(), True: empty_stats()}
+    for row in await db.execute(await population_totals_query(db)):
+        stats[bool(row[0])] = dict(zip(STAT_COLUMNS, row[1:]))
+    return stats
+
+
+async def get_population_stats(db: AsyncSession) -> Dict[bool, dict]:
+    stats = {False: empty_stats(), True: empty_stats()}
+    for row in (await db.execute(select(population_stats))).mappings():
+        stats[row["infected"]] = {column: row[column] for column in STAT_COLUMNS}
+    return stats
+
+
+async def rebuild_population_stats(db: AsyncSession) -> None:
+    """Replace the summary with freshly aggregated totals. The caller commits."""
+    await db.execute(delete(population_stats))
+    await db.execute(
+        insert(population_stats).from_select(
+            ["infected", *STAT_COLUMNS], await population_totals_query(db)
+        )
+    )
+
+
+async def ensure_population_stats(db: AsyncSession) -> None:
+    """Fill ``population_stats`` on first start against an existing database."""
+    has_rows = await db.scalar(select(exists().select_from(population_stats)))
+    has_survivors = await db.scalar(select(exists().select_from(SurvivorModel)))
+    if has_survivors and not has_rows:
+        await rebuild_population_stats(db)
+        await db.commit()
+
+
+async def apply_population_deltas(deltas: Dict[bool, dict], db: AsyncSession) -> None:
+    """Add signed changes to the summary rows with a single upsert."""
+    rows = [
+        {"infected": infected, **{c: changes.get(c, 0) for c in STAT_COLUMNS}}
+        for infected, changes in deltas.items()
+        if any(changes.values())
+    ]
+    if not rows:
+        return
+
+    stmt = dialect_insert(db)(population_stats).values(rows)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[population_stats.c.infected],
+            set_={
+                column: population_stats.c[column] + stmt.excluded[column]
+                for column in STAT_COLUMNS
+            },
+        )
+    )
+
+
+async def record_new_survivors(
+    inventories_added: Iterable[dict], db: AsyncSession
+) -> None:
+    """Count freshly registered (healthy) survivors and their starting items."""
+    healthy = empty_stats()
+    for items in inventories_added:
+        healthy["survivors"] += 1
+        for column in ITEM_COLUMNS:
+            healthy[column] += items.get(column, 0)
+    await apply_population_deltas({False: healthy}, db)
+
+
+async def record_infections(survivor_ids: Iterable[int], db: AsyncSession) -> None:
+    """Move newly infected survivors and their items to the infected totals.
+
+    Must run in the transaction that flipped ``infected``; trades leave the
+    totals unchanged, so this and registration are the only updates needed.
+    """
+    moved = empty_stats()
+    for items in (await get_inventories(survivor_ids, db)).values():
+        moved["survivors"] += 1
+        for column in ITEM_COLUMNS:
+            moved[column] += items[column]
+    await apply_population_deltas(
+        {False: {c: -value for c, value in moved.items()}, True: moved}, db
+    )
+
+
+async def get_infection_share(db: AsyncSession, infected: bool) -> InfectionShare:
+    stats = await get_population_stats(db)
+    total = stats[False]["survivors"] + stats[True]["survivors"]
+    survivors = stats[infected]["survivors"]
+    return InfectionShare(
+        survivors=survivors,
+        total=total,
+        percentage=round(100 * survivors / total, 2) if total else 0.0,
+    )
+
+
+async def get_resource_averages(db: AsyncSession) -> ResourceAverages:
+    healthy = (await get_population_stats(db))[False]
+    count = healthy["survivors"]
+    return ResourceAverages(
+        healthy_survivors=count,
+        **{c: round(healthy[c] / count, 2) if count else 0.0 for c in ITEM_COLUMNS},
+    )
+
+
+async def get_points_lost(db: AsyncSession) -> PointsLost:
+    infected = (await get_population_stats(db))[True]
+    catalog = await get_item_catalog(db)
+    return PointsLost(
+        infected_survivors=infected["survivors"],
+        points_lost=sum(
+            catalog.points[item_type] * infected[item_type.value]
+            for item_type in ItemType
+        ),
+        items=Inventory(**{c: infected[c] for c in ITEM_COLUMNS}),
+    )
@@ -1,41 +1,97 @@
-from typing import List, Optional
+import base64
+import logging
+from enum import Enum
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from fastapi import HTTPException
-from sqlalchemy import func, select, update
+from sqlalchemy import Row, Select, bindparam, exists, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from api.database import SurvivorModel
-from api.models import Inventory, Location, Survivor, SurvivorCreate
+from api.database import (
+    SurvivorModel,
+    dialect_insert,
+    infection_reports,
+    sees_latest_writes,
+)
+from api.models import (
+    Location,
+    Survivor,
+    SurvivorBatchError,
+    SurvivorBatchResult,
+    SurvivorCreate,
+)
+from api.serialization import dumps, dumps_array, dumps_lines
+from api.service.cache.survivor_cache import survivor_cache
+from api.service.events.change_feed import change_feed
 from api.service.inventory.inventory_service import (
+    INSERT_CHUNK_SIZE,
+    add_inventories,
     add_inventory_items,
-    get_survivor_inventory,
+    get_inventories,
 )
+from api.service.location.geo import geocell
+from api.service.reports.reports_service import record_new_survivors
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+MAX_SURVIVOR_BATCH = 5000
+NAME_TAKEN = "A survivor with this name already exists"
+# Unique indexes that reject a second survivor with the same (lower-cased) name.
+NAME_INDEXES = {"ix_survivors_name", "ix_survivors_name_lower"}
+
+
+def _name_taken(error: IntegrityError) -> bool:
+    """Whether ``error`` was raised by one of the ``NAME_INDEXES``."""
+    # asyncpg reports the violated index, SQLite only names the column.
+    constraint = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint is not None:
+        return constraint in NAME_INDEXES
+    return str(error.orig) in {
+        "UNIQUE constraint failed: survivors.name",
+        "UNIQUE constraint failed: survivors.name_lower",
+    }
 
 
 async def create_survivor(survivor: SurvivorCreate, db: AsyncSession) -> Survivor:
-    existing_survivor = await get_survivor_by_name(survivor.name, db)
-    if existing_survivor:
-        raise HTTPException(
-            status_code=400, detail="A survivor with this name already exists"
-        )
+    name_taken = await db.scalar(
+        select(exists().where(SurvivorModel.name_lower == survivor.name.lower()))
+    )
+    if name_taken:
+        raise HTTPException(status_code=400, detail=NAME_TAKEN)
 
     try:
         db_survivor = SurvivorModel(
             name=survivor.name,
+            name_lower=survivor.name.lower(),
             age=survivor.age,
             gender=survivor.gender,
             latitude=survivor.latitude,
             longitude=survivor.longitude,
+            geocell=geocell(survivor.latitude, survivor.longitude),
         )
 
         db.add(db_survivor)
         await db.flush()
 
         await add_inventory_items(db_survivor.id, survivor.inventory.model_dump(), db)
+        await record_new_survivors([survivor.inventory.model_dump()], db)
         await db.commit()
+        await survivor_cache.invalidate_names([survivor.name])
 
-        return Survivor(
+        created = Survivor(
             id=db_survivor.id,
             name=db_survivor.name,
             age=db_survivor.age,
@@ -46,6 +102,20 @@ async def create_survivor(survivor: SurvivorCreate, db: AsyncSession) -> Survivo
             reporters=[],
             inventory=survivor.inventory,
         )
+        change_feed.publish(
+            "survivor.created", survivor=created.model_dump(mode="json")
+        )
+        return created
+    except IntegrityError as e:
+        await db.rollback()
+        # Lost a race with a concurrent registration of the same name.
+        if _name_taken(e):
+            raise HTTPException(status_code=400, detail=NAME_TAKEN) from e
+        logger.warning("Failed to create survivor: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to create survivor"
+        ) from e
     except Exception as e:
         await db.rollback()
         print(f"Error creating survivor: {str(e)}")
@@ -55,93 +125,437 @@ async def create_survivor(survivor: SurvivorCreate, db: AsyncSession) -> Survivo
         ) from e
 
 
+async def create_survivors_batch(
+    survivors: List[SurvivorCreate], db: AsyncSession
+) -> SurvivorBatchResult:
+    """Register many survivors with bulk inserts.
+
+    Name uniqueness is checked for the whole batch with one ``IN`` query.
+    Rows that clash with an existing survivor or an earlier row of the batch
+    are reported as errors while the rest are still created.
+    """
+    errors = []
+    existing = await db.execute(
+        select(SurvivorModel.name_lower).where(
+            SurvivorModel.name_lower.in_({s.name.lower() for s in survivors})
+        )
+    )
+    taken = set(existing.scalars().all())
+
+    pending = {}
+    for index, survivor in enumerate(survivors):
+        if survivor.name.lower() in taken:
+            errors.append(
+                SurvivorBatchError(
+                    index=index,
+                    name=survivor.name,
+                    detail=NAME_TAKEN,
+                )
+            )
+            continue
+        taken.add(survivor.name.lower())
+        pending[survivor.name] = (index, survivor)
+
+    created = {}
+    try:
+        rows = [
+            {
+                **survivor.model_dump(exclude={"inventory"}),
+                "name_lower": survivor.name.lower(),
+                "geocell": geocell(survivor.latitude, survivor.longitude),
+            }
+            for _, survivor in pending.values()
+        ]
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            result = await db.execute(
+                dialect_insert(db)(SurvivorModel)
+                .values(rows[start:start + INSERT_CHUNK_SIZE])
+                .on_conflict_do_nothing()
+                .returning(SurvivorModel.id, SurvivorModel.name)
+            )
+            for row in result:
+                index, survivor = pending[row.name]
+                created[index] = Survivor(
+                    id=row.id,
+                    **survivor.model_dump(exclude={"inventory"}),
+                    inventory=survivor.inventory,
+                )
+
+        items_by_survivor = {s.id: s.inventory.model_dump() for s in created.values()}
+        await add_inventories(items_by_survivor, db)
+        await record_new_survivors(items_by_survivor.values(), db)
+        await db.commit()
+        await survivor_cache.invalidate_names(s.name for s in created.values())
+        for index in sorted(created):
+            change_feed.publish(
+                "survivor.created", survivor=created[index].model_dump(mode="json")
+            )
+    except Exception as e:
+        await db.rollback()
+        logger.warning("Failed to create %d survivors: %s", len(survivors), e)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to create survivors"
+        ) from e
+
+    # Rows skipped by ON CONFLICT were registered concurrently by another request.
+    for name, (index, _) in pending.items():
+        if index not in created:
+            errors.append(
+                SurvivorBatchError(
+                    index=index,
+                    name=name,
+                    detail=NAME_TAKEN,
+                )
+            )
+
+    return SurvivorBatchResult(
+        created=[created[index] for index in sorted(created)],
+        errors=sorted(errors, key=lambda error: error.index),
+    )
+
+
 async def update_location(
     survivor_id: int, location: Location, db: AsyncSession
 ) -> dict:
     result = await db.execute(
         update(SurvivorModel)
         .where(SurvivorModel.id == survivor_id)
-        .values(latitude=location.latitude, longitude=location.longitude)
+        .values(
+            latitude=location.latitude,
+            longitude=location.longitude,
+            geocell=geocell(location.latitude, location.longitude),
+        )
     )
 
     await db.commit()
+    await survivor_cache.invalidate([survivor_id])
 
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Survivor not found")
+    change_feed.publish(
+        "survivor.location",
+        id=survivor_id,
+        latitude=location.latitude,
+        longitude=location.longitude,
+    )
     return {"message": "Location updated successfully"}
 
 
+async def update_locations(locations: Dict[int, Location], db: AsyncSession) -> int:
+    """Apply many location updates as one executemany UPDATE and commit.
+
+    Unknown ids are skipped. Returns the number of survivors that were found
+    and updated.
+    """
+    # Survivors are never deleted, so the ids found here are the rows updated.
+    matched = set()
+    ids = list(locations)
+    for start in range(0, len(ids), INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            select(SurvivorModel.id).where(
+                SurvivorModel.id.in_(ids[start:start + INSERT_CHUNK_SIZE])
+            )
+        )
+        matched.update(result.scalars())
+    locations = {
+        survivor_id: location
+        for survivor_id, location in locations.items()
+        if survivor_id in matched
+    }
+    if not locations:
+        return 0
+
+    survivors = SurvivorModel.__table__
+    await db.execute(
+        update(survivors)
+        .where(survivors.c.id == bindparam("survivor_id"))
+        .values(
+            latitude=bindparam("latitude"),
+            longitude=bindparam("longitude"),
+            geocell=bindparam("geocell"),
+        ),
+        [
+            {
+                "survivor_id": survivor_id,
+                "latitude": location.latitude,
+                "longitude": location.longitude,
+                "geocell": geocell(location.latitude, location.longitude),
+            }
+            for survivor_id, location in locations.items()
+        ],
+    )
+    await db.commit()
+    await survivor_cache.invalidate(locations.keys())
+    for survivor_id, location in locations.items():
+        change_feed.publish(
+            "survivor.location",
+            id=survivor_id,
+            latitude=location.latitude,
+            longitude=location.longitude,
+        )
+    return len(locations)
+
+
 async def get_all_survivors(db: AsyncSession) -> List[Survivor]:
+    result = await db.execute(survivor_columns().order_by(SurvivorModel.id))
+    return await build_survivors(result.all(), db)
+
+
+async def _page_rows(
+    db: AsyncSession, limit: int, cursor: Optional[str]
+) -> Tuple[Sequence[Row], Optional[str]]:
+    query = survivor_columns().order_by(SurvivorModel.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(SurvivorModel.id > decode_cursor(cursor))
+
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].id) if has_more else None
+
+
+async def get_survivors_page_json(
+    db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Tuple[bytes, Optional[str]]:
+    """Return one keyset page of survivors ordered by id, as a JSON array.
+
+    The page is assembled from three queries regardless of table size: the
+    survivor rows, their inventories and their reporters. The cursor of the
+    next page is ``None`` on the last one.
+    """
+    rows, next_cursor = await _page_rows(db, limit, cursor)
+    return dumps_array(await survivor_dicts(rows, db)), next_cursor
+
+
+def _filtered_survivors(
+    infected: Optional[bool] = None,
+    min_latitude: Optional[float] = None,
+    max_latitude: Optional[float] = None,
+    min_longitude: Optional[float] = None,
+    max_longitude: Optional[float] = None,
+) -> Select:
+    query = survivor_columns().order_by(SurvivorModel.id)
+    if infected is not None:
+        query = query.where(SurvivorModel.infected == infected)
+    if min_latitude is not None:
+        query = query.where(SurvivorModel.latitude >= min_latitude)
+    if max_latitude is not None:
+        query = query.where(SurvivorModel.latitude <= max_latitude)
+    if min_longitude is not None:
+        query = query.where(SurvivorModel.longitude >= min_longitude)
+    if max_longitude is not None:
+        query = query.where(SurvivorModel.longitude <= max_longitude)
+    return query
+
+
+async def _iter_row_batches(
+    db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE, **filters
+) -> AsyncIterator[Sequence[Row]]:
+    query = _filtered_survivors(**filters)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def export_survivors_ndjson(
+    db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE, **filters
+) -> AsyncIterator[bytes]:
+    """Newline-delimited JSON export, one chunk per batch of survivors.
+
+    Rows are streamed in id order through a server-side cursor, so only one
+    batch is held in memory at a time and the export cost does not grow with
+    the size of the population. ``filters`` are ``infected`` and the
+    ``min_``/``max_`` latitude and longitude bounds.
+    """
+    async for rows in _iter_row_batches(db, batch_size, **filters):
+        yield dumps_lines(await survivor_dicts(rows, db))
+
+
+class Projection(str, Enum):
+    """How much of a survivor an internal lookup loads.
+
+    ``status`` is ``id``, ``infected`` and ``version`` from the survivors
+    table alone, ``inventory`` adds the inventory with one more query and
+    ``full`` builds the complete ``Survivor`` including its reporters.
+    """
+
+    status = "status"
+    inventory = "inventory"
+    full = "full"
+
+
+async def get_survivors_by_ids(
+    survivor_ids: Iterable[int],
+    db: AsyncSession,
+    projection: Projection = Projection.full,
+) -> Dict[int, Union[dict, Survivor]]:
+    """Look up several survivors at once, loading only what ``projection`` needs.
+
+    The number of queries depends on the projection, never on the number of
+    ids. Unknown ids are left out of the result. ``status`` and ``inventory``
+    return plain dicts, ``full`` returns ``Survivor`` models.
+    """
+    ids = list(survivor_ids)
+    if not ids:
+        return {}
+
+    if projection == Projection.full:
+        result = await db.execute(survivor_columns().where(SurvivorModel.id.in_(ids)))
+        return {
+            survivor.id: survivor
+            for survivor in await build_survivors(result.all(), db)
+        }
+
     result = await db.execute(
-        select(SurvivorModel).options(selectinload(SurvivorModel.reporters))
-    )
-    db_survivors = result.scalars().all()
-
-    survivors = []
-
-    for db_survivor in db_survivors:
-        inventory = await get_survivor_inventory(db_survivor.id, db)
-        survivors.append(
-            Survivor(
-                id=db_survivor.id,
-                name=db_survivor.name,
-                age=db_survivor.age,
-                gender=db_survivor.gender,
-                latitude=db_survivor.latitude,
-                longitude=db_survivor.longitude,
-                infected=db_survivor.infected,
-                reporters=[reporter.id for reporter in db_survivor.reporters],
-                inventory=Inventory(**inventory),
-            )
+        select(SurvivorModel.id, SurvivorModel.infected, SurvivorModel.version).where(
+            SurvivorModel.id.in_(ids)
         )
+    )
+    survivors = {row.id: dict(row._mapping) for row in result}
+    if projection == Projection.inventory:
+        inventories = await get_inventories(survivors.keys(), db)
+        for survivor_id, survivor in survivors.items():
+            survivor["inventory"] = inventories[survivor_id]
     return survivors
 
 
 async def get_survivor_by_id(survivor_id: int, db: AsyncSession) -> Optional[Survivor]:
-    result = await db.execute(
-        select(SurvivorModel)
-        .options(selectinload(SurvivorModel.reporters))
-        .where(SurvivorModel.id == survivor_id)
-    )
-    db_survivor = result.scalar_one_or_none()
+    return (await get_survivors_by_ids([survivor_id], db)).get(survivor_id)
 
-    if db_survivor is None:
+
+async def _read_through(
+    query: Select, db: AsyncSession, cached: Optional[bytes]
+) -> Optional[bytes]:
+    if cached is not None:
+        return cached
+    token = survivor_cache.fill_token()
+    survivor = await _get_survivor_dict(query, db)
+    if survivor is None:
         return None
+    if not sees_latest_writes(db):
+        # A replica may lag behind a write whose invalidation already ran.
+        return dumps(survivor)
+    return await survivor_cache.store(survivor, token)
+
+
+async def get_survivor_json_by_id(
+    survivor_id: int, db: AsyncSession, use_cache: bool = True
+) -> Optional[bytes]:
+    """Serialized survivor, read through the survivor cache.
 
-    inventory = await get_survivor_inventory(db_survivor.id, db)
-    return Survivor(
-        id=db_survivor.id,
-        name=db_survivor.name,
-        age=db_survivor.age,
-        gender=db_survivor.gender,
-        latitude=db_survivor.latitude,
-        longitude=db_survivor.longitude,
-        infected=db_survivor.infected,
-        reporters=[reporter.id for reporter in db_survivor.reporters],
-        inventory=Inventory(**inventory),
+    ``use_cache=False`` skips the lookup for clients that must see their own
+    writes; the row they read still refills the cache.
+    """
+    return await _read_through(
+        survivor_columns().where(SurvivorModel.id == survivor_id),
+        db,
+        await survivor_cache.get_by_id(survivor_id) if use_cache else None,
+    )
+
+
+async def get_survivor_json_by_name(
+    name: str, db: AsyncSession, use_cache: bool = True
+) -> Optional[bytes]:
+    """Serialized survivor, read through the survivor cache."""
+    return await _read_through(
+        survivor_columns().where(SurvivorModel.name_lower == name.lower()),
+        db,
+        await survivor_cache.get_by_name(name) if use_cache else None,
     )
 
 
 async def get_survivor_by_name(name: str, db: AsyncSession) -> Optional[Survivor]:
     result = await db.execute(
-        select(SurvivorModel)
-        .options(selectinload(SurvivorModel.reporters))
-        .where(func.lower(SurvivorModel.name) == func.lower(name))
+        survivor_columns().where(SurvivorModel.name_lower == name.lower())
     )
-    db_survivor = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if db_survivor is None:
+    if row is None:
         return None
 
-    inventory = await get_survivor_inventory(db_survivor.id, db)
-    return Survivor(
-        id=db_survivor.id,
-        name=db_survivor.name,
-        age=db_survivor.age,
-        gender=db_survivor.gender,
-        latitude=db_survivor.latitude,
-        longitude=db_survivor.longitude,
-        infected=db_survivor.infected,
-        reporters=[reporter.id for reporter in db_survivor.reporters],
-        inventory=Inventory(**inventory),
+    return (await build_survivors([row], db))[0]
+
+
+def encode_cursor(survivor_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{survivor_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        prefix, survivor_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        )
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(survivor_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def survivor_columns() -> Select:
+    return select(
+        SurvivorModel.id,
+        SurvivorModel.name,
+        SurvivorModel.age,
+        SurvivorModel.gender,
+        SurvivorModel.latitude,
+        SurvivorModel.longitude,
+        SurvivorModel.infected,
+    )
+
+
+async def _get_reporter_ids(
+    survivor_ids: List[int], db: AsyncSession
+) -> Dict[int, List[int]]:
+    reporters = {survivor_id: [] for survivor_id in survivor_ids}
+    if not survivor_ids:
+        return reporters
+
+    result = await db.execute(
+        select(infection_reports.c.reported_id, infection_reports.c.reporter_id)
+        .where(infection_reports.c.reported_id.in_(survivor_ids))
+        .order_by(infection_reports.c.reporter_id)
     )
+    for row in result:
+        reporters[row.reported_id].append(row.reporter_id)
+
+    return reporters
+
+
+async def survivor_dicts(rows: Sequence[Row], db: AsyncSession) -> List[dict]:
+    """Survivor payloads as plain dicts, ready to be encoded as JSON.
+
+    The rows come from our own tables, which only hold values that were
+    validated on the way in, so no ``Survivor`` model is built for them.
+    Keys follow the field order of ``Survivor``.
+    """
+    survivor_ids = [row.id for row in rows]
+    inventories = await get_inventories(survivor_ids, db)
+    reporters = await _get_reporter_ids(survivor_ids, db)
+
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "age": row.age,
+            "gender": row.gender,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "infected": row.infected,
+            "inventory": inventories[row.id],
+            "reporters": reporters[row.id],
+        }
+        for row in rows
+    ]
+
+
+async def _get_survivor_dict(query: Select, db: AsyncSession) -> Optional[dict]:
+    row = (await db.execute(query)).one_or_none()
+    if row is None:
+        return None
+    return (await survivor_dicts([row], db))[0]
+
+
+async def build_survivors(rows: Sequence[Row], db: AsyncSession) -> List[Survivor]:
+    return [Survivor(**survivor) for survivor in await survivor_dicts(rows, db)]
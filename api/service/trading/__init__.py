@@ -0,0 +1,3 @@
+"""
+ZSSN API trading service package
+"""
@@ -1,138 +1,228 @@
-from api.database import ItemModel, ItemType, survivor_items
-from api.models import Trade
-from api.service.inventory.inventory_service import get_survivor_inventory
-from api.service.survivors.survivor_service import get_survivor_by_id
+import asyncio
+import logging
+import os
+import random
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Tuple, TypeVar
+
 from fastapi import HTTPException
-from sqlalchemy import select, update
+from sqlalchemy import tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.database import ItemType, SurvivorModel
+from api.models import Trade, TradeBatchResult, TradeItem, TradeResult
+from api.service.cache.survivor_cache import survivor_cache
+from api.service.events.change_feed import change_feed
+from api.service.inventory.inventory_service import apply_inventory_deltas
+from api.service.survivors.survivor_service import Projection, get_survivors_by_ids
 
-async def _transfer_item(
-    from_id: int, to_id: int, item: ItemModel, quantity: int, db: AsyncSession
-) -> None:
-    sender_item = await db.execute(
-        select(survivor_items.c.quantity).where(
-            (survivor_items.c.survivor_id == from_id)
-            & (survivor_items.c.item_id == item.id)
-        )
-    )
+logger = logging.getLogger(__name__)
 
-    current_qty = sender_item.scalar_one()
-    new_qty = current_qty - quantity
-    if new_qty < 0:
-        raise HTTPException(
-            status_code=400, detail=f"Insufficient quantity of {item.name}"
-        )
+MAX_TRADE_BATCH = 1000
+TRADE_MAX_ATTEMPTS = int(os.getenv("TRADE_MAX_ATTEMPTS", "5"))
+TRADE_RETRY_BACKOFF = float(os.getenv("TRADE_RETRY_BACKOFF", "0.005"))
 
-    await db.execute(
-        update(survivor_items)
-        .where(
-            (survivor_items.c.survivor_id == from_id)
-            & (survivor_items.c.item_id == item.id)
-        )
-        .values(quantity=new_qty)
+T = TypeVar("T")
+
+
+def _trade_points(side: TradeItem) -> int:
+    return sum(
+        ItemType[item].points * qty for item, qty in side.items.model_dump().items()
     )
 
-    receiver_item = await db.execute(
-        select(survivor_items.c.quantity).where(
-            (survivor_items.c.survivor_id == to_id)
-            & (survivor_items.c.item_id == item.id)
+
+def _check_trade(
+    trade: Trade, infected: Dict[int, bool], inventories: Dict[int, dict]
+) -> None:
+    """Validate a trade against a snapshot of its traders, raising on failure."""
+    trader1, trader2 = trade.trader1, trade.trader2
+    if trader1.survivor_id not in infected or trader2.survivor_id not in infected:
+        raise HTTPException(status_code=404, detail="One or both traders not found")
+
+    if infected[trader1.survivor_id] or infected[trader2.survivor_id]:
+        raise HTTPException(status_code=400, detail="Infected survivors cannot trade")
+
+    for label, side in (("Trader 1", trader1), ("Trader 2", trader2)):
+        inventory = inventories[side.survivor_id]
+        for item_type, qty in side.items.model_dump().items():
+            if inventory[item_type] < qty:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{label} doesn't have enough {item_type}",
+                )
+
+    if _trade_points(trader1) != _trade_points(trader2):
+        raise HTTPException(status_code=400, detail="Trade points must be equal")
+
+
+def _trade_deltas(trade: Trade) -> Dict[int, dict]:
+    deltas = defaultdict(lambda: defaultdict(int))
+    for giver, receiver in (
+        (trade.trader1, trade.trader2),
+        (trade.trader2, trade.trader1),
+    ):
+        for item_type, qty in giver.items.model_dump().items():
+            deltas[giver.survivor_id][item_type] -= qty
+            deltas[receiver.survivor_id][item_type] += qty
+    return deltas
+
+
+def _merge_deltas(target: Dict[int, dict], deltas: Dict[int, dict]) -> None:
+    for survivor_id, items in deltas.items():
+        for item_type, delta in items.items():
+            target[survivor_id][item_type] += delta
+
+
+async def announce_trade(deltas: Dict[int, dict]) -> None:
+    """Drop cached traders and publish the committed inventory changes."""
+    await survivor_cache.invalidate(deltas.keys())
+    changes = {
+        survivor_id: {item: delta for item, delta in items.items() if delta}
+        for survivor_id, items in deltas.items()
+    }
+    changes = {survivor_id: items for survivor_id, items in changes.items() if items}
+    if changes:
+        change_feed.publish("trade", inventory_deltas=changes)
+
+
+async def _read_traders(survivor_ids, db: AsyncSession):
+    traders = await get_survivors_by_ids(survivor_ids, db, Projection.inventory)
+    infected = {i: trader["infected"] for i, trader in traders.items()}
+    versions = {i: trader["version"] for i, trader in traders.items()}
+    inventories = {i: trader["inventory"] for i, trader in traders.items()}
+    return infected, versions, inventories
+
+
+async def _claim_versions(versions: Dict[int, int], db: AsyncSession) -> None:
+    """Bump the version of every trader, provided nobody else did since we read.
+
+    A trade validated against a snapshot that another writer has since
+    changed must not be applied, so any mismatch rejects the whole claim.
+    """
+    if not versions:
+        return
+    result = await db.execute(
+        update(SurvivorModel)
+        .where(
+            tuple_(SurvivorModel.id, SurvivorModel.version).in_(list(versions.items()))
         )
+        .values(version=SurvivorModel.version + 1)
     )
-    existing_item = receiver_item.first()
-
-    if existing_item:
-        current_qty = existing_item[0]
-        new_qty = current_qty + quantity
-        await db.execute(
-            update(survivor_items)
-            .where(
-                (survivor_items.c.survivor_id == to_id)
-                & (survivor_items.c.item_id == item.id)
-            )
-            .values(quantity=new_qty)
-        )
-    else:
-        await db.execute(
-            survivor_items.insert().values(
-                survivor_id=to_id, item_id=item.id, quantity=quantity
-            )
+    if result.rowcount != len(versions):
+        raise HTTPException(
+            status_code=409, detail="Survivor changed concurrently, please retry"
         )
 
 
-async def trade_items(trade: Trade, db: AsyncSession) -> dict:
-    try:
-        async with db.begin():
-            trader1 = await get_survivor_by_id(trade.trader1.survivor_id, db)
-            trader2 = await get_survivor_by_id(trade.trader2.survivor_id, db)
+async def retry_on_conflict(settle: Callable[[], Awaitable[T]]) -> T:
+    """Run ``settle`` again on a 409, with jittered exponential backoff.
 
-            if not trader1 or not trader2:
-                raise HTTPException(
-                    status_code=404, detail="One or both traders not found"
-                )
+    Each attempt runs its own transaction, so a retry re-reads the traders
+    and validates the trade against their current state.
+    """
+    for attempt in range(TRADE_MAX_ATTEMPTS):
+        try:
+            return await settle()
+        except HTTPException as e:
+            if e.status_code != 409 or attempt == TRADE_MAX_ATTEMPTS - 1:
+                raise
+        await asyncio.sleep(random.uniform(0, TRADE_RETRY_BACKOFF * 2**attempt))
 
-            if trader1.infected or trader2.infected:
-                raise HTTPException(
-                    status_code=400, detail="Infected survivors cannot trade"
-                )
 
-            inventory1 = await get_survivor_inventory(trader1.id, db)
-            inventory2 = await get_survivor_inventory(trader2.id, db)
+async def settle_trade(trade: Trade, db: AsyncSession) -> Dict[int, dict]:
+    """Validate and apply one trade inside the caller's transaction.
 
-            for item_type, qty in trade.trader1.items.dict().items():
-                if inventory1[item_type] < qty:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Trader 1 doesn't have enough {item_type}",
-                    )
+    Returns the per-survivor inventory deltas. Raises 400/404 when the trade
+    breaks the trading rules and 409 when a trader changed concurrently.
+    """
+    survivor_ids = {trade.trader1.survivor_id, trade.trader2.survivor_id}
+    infected, versions, inventories = await _read_traders(survivor_ids, db)
+    _check_trade(trade, infected, inventories)
+    await _claim_versions(versions, db)
+    deltas = _trade_deltas(trade)
+    await apply_inventory_deltas(deltas, db)
+    return deltas
 
-            for item_type, qty in trade.trader2.items.dict().items():
-                if inventory2[item_type] < qty:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Trader 2 doesn't have enough {item_type}",
-                    )
 
-            points1 = sum(
-                ItemType[item].points * qty
-                for item, qty in trade.trader1.items.dict().items()
-            )
-            points2 = sum(
-                ItemType[item].points * qty
-                for item, qty in trade.trader2.items.dict().items()
-            )
+async def trade_items(trade: Trade, db: AsyncSession) -> dict:
+    """Execute a trade with a constant number of statements.
 
-            if points1 != points2:
-                raise HTTPException(
-                    status_code=400, detail="Trade points must be equal"
-                )
+    Both traders are read once, the exchange is validated in memory, the
+    traders' versions are claimed and the exchange applied with a single
+    guarded upsert, so the cost does not depend on how many item types change
+    hands. Losing a race to another writer retries the trade.
+    """
 
-            items_result = await db.execute(select(ItemModel))
-            items_db = {item.name: item for item in items_result.scalars().all()}
-
-            for item_type, qty in trade.trader1.items.dict().items():
-                if qty > 0:
-                    item = items_db[ItemType[item_type]]
-                    await _transfer_item(
-                        from_id=trade.trader1.survivor_id,
-                        to_id=trade.trader2.survivor_id,
-                        item=item,
-                        quantity=qty,
-                        db=db,
-                    )
+    async def settle() -> Dict[int, dict]:
+        async with db.begin():
+            return await settle_trade(trade, db)
 
-            for item_type, qty in trade.trader2.items.dict().items():
-                if qty > 0:
-                    item = items_db[ItemType[item_type]]
-                    await _transfer_item(
-                        from_id=trade.trader2.survivor_id,
-                        to_id=trade.trader1.survivor_id,
-                        item=item,
-                        quantity=qty,
-                        db=db,
+    try:
+        await announce_trade(await retry_on_conflict(settle))
+        return {"message": "Trade completed successfully"}
+    except Exception as e:
+        print(f"Error during trade: {str(e)}")
+        raise
+
+
+async def trade_items_batch(
+    trades: List[Trade], db: AsyncSession, atomic: bool = True
+) -> TradeBatchResult:
+    """Validate and settle many trades in one transaction.
+
+    Every trade is checked in order against a single snapshot of the
+    involved inventories, so later trades see the effect of earlier ones. In
+    atomic mode any failure leaves the whole batch unapplied; otherwise the
+    valid trades are applied and the failures reported next to them. The
+    snapshot is protected by the traders' versions like a single trade.
+    """
+    survivor_ids = {
+        side.survivor_id for trade in trades for side in (trade.trader1, trade.trader2)
+    }
+
+    async def settle() -> Tuple[List[TradeResult], Dict[int, dict]]:
+        results = []
+        pending = defaultdict(lambda: defaultdict(int))
+        async with db.begin():
+            infected, versions, inventories = await _read_traders(survivor_ids, db)
+
+            for index, trade in enumerate(trades):
+                try:
+                    _check_trade(trade, infected, inventories)
+                except HTTPException as e:
+                    results.append(
+                        TradeResult(index=index, success=False, detail=e.detail)
+                    )
+                    continue
+
+                deltas = _trade_deltas(trade)
+                _merge_deltas(inventories, deltas)
+                _merge_deltas(pending, deltas)
+                results.append(
+                    TradeResult(
+                        index=index,
+                        success=True,
+                        detail="Trade completed successfully",
                     )
+                )
 
-            return {"message": "Trade completed successfully"}
+            if atomic and not all(result.success for result in results):
+                for result in results:
+                    if result.success:
+                        result.success = False
+                        result.detail = "Not applied: another trade in the batch failed"
+                return results, {}
+
+            await _claim_versions({i: versions[i] for i in pending}, db)
+            await apply_inventory_deltas(pending, db)
+        return results, pending
+
+    try:
+        results, pending = await retry_on_conflict(settle)
+        await announce_trade(pending)
+        return TradeBatchResult(
+            applied=any(result.success for result in results), results=results
+        )
     except Exception as e:
-        print(f"Error during trade: {str(e)}")
+        logger.warning("Batch of %d trades failed: %s", len(trades), e)
         raise
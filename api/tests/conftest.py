@@ -1,15 +1,44 @@
+from typing import Optional
+
 import pytest_asyncio
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.database import AsyncSessionLocal, Base, ItemModel, ItemType, engine
+from api.models import Gender, Inventory, Survivor, SurvivorCreate
+from api.service.cache.backends import LRUCache
+from api.service.cache.survivor_cache import survivor_cache
+from api.service.graph.report_graph import report_graph
+from api.service.inventory.item_catalog import invalidate_item_catalog
+from api.service.offers.offers_service import order_book
+from api.service.survivors.survivor_service import create_survivor
+
+
+def survivor_form(
+    name: str,
+    inventory: Optional[Inventory] = None,
+    latitude: float = 0.0,
+    longitude: float = 0.0,
+) -> SurvivorCreate:
+    return SurvivorCreate(
+        name=name,
+        age=30,
+        gender=Gender.other,
+        latitude=latitude,
+        longitude=longitude,
+        inventory=inventory or Inventory(),
+    )
 
 
 @pytest_asyncio.fixture
 async def db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
+        await session.execute(text('DROP TABLE IF EXISTS app_metadata'))
+        await session.execute(text('DROP TABLE IF EXISTS trade_offers'))
         await session.execute(text('DROP TABLE IF EXISTS infection_reports'))
         await session.execute(text('DROP TABLE IF EXISTS survivor_items'))
+        await session.execute(text('DROP TABLE IF EXISTS inventories'))
+        await session.execute(text('DROP TABLE IF EXISTS population_stats'))
         await session.execute(text('DROP TABLE IF EXISTS survivors'))
         await session.execute(text('DROP TABLE IF EXISTS items'))
         await session.commit()
@@ -25,8 +54,28 @@ async def db() -> AsyncSession:
         ]
         session.add_all(items)
         await session.commit()
+        invalidate_item_catalog()
+        survivor_cache.backend = LRUCache()
+        order_book.clear()
+        report_graph.clear()
 
         yield session
 
         await session.rollback()
         await session.close()
+
+
+@pytest_asyncio.fixture
+async def make_survivor(db: AsyncSession):
+    """Register a survivor through the service, see ``survivor_form``."""
+    async def make(
+        name: str,
+        inventory: Optional[Inventory] = None,
+        latitude: float = 0.0,
+        longitude: float = 0.0,
+    ) -> Survivor:
+        return await create_survivor(
+            survivor_form(name, inventory, latitude, longitude), db
+        )
+
+    return make
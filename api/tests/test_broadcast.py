@@ -0,0 +1,30 @@
+import asyncio
+import os
+
+import pytest
+
+from api.service.events.broadcast import Broadcast
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_other_workers_only(tmp_path, monkeypatch):
+    workers = []
+    for pid in (101, 102):
+        monkeypatch.setattr(os, "getpid", lambda pid=pid: pid)
+        worker = Broadcast(str(tmp_path))
+        await worker.start()
+        workers.append(worker)
+    first, second = workers
+    received = []
+    first.on("ping", lambda data: received.append(("first", data)))
+    second.on("ping", lambda data: received.append(("second", data)))
+
+    first.publish("ping", keys=[1, 2])
+    await asyncio.sleep(0.05)
+    assert received == [("second", {"keys": [1, 2]})]
+
+    second.stop()
+    first.publish("ping", keys=[3])
+    assert first.stats()["dropped"] == 0
+    assert not os.path.exists(tmp_path / "102.sock")
+    first.stop()
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from api.main import endpoint_survivor_changes
+from api.models import (
+    Inventory,
+    Location,
+    ReportInfection,
+    Trade,
+    TradeItem,
+)
+from api.service.events.change_feed import ChangeFeed, change_feed, sse_events
+from api.service.infection.infection_service import report_infection
+from api.service.survivors.survivor_service import (
+    update_location,
+    update_locations,
+)
+from api.service.trading.trading_service import trade_items
+
+
+async def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(await subscription.next())
+    return events
+
+@pytest.mark.asyncio
+async def test_change_feed_resume_and_reset():
+    feed = ChangeFeed(history=3)
+    for i in range(5):
+        feed.publish("survivor.location", id=i)
+
+    resumed = await _drain(feed.subscribe(last_seq=3))
+    assert [event.seq for event in resumed] == [4, 5]
+
+    too_old = await _drain(feed.subscribe(last_seq=1))
+    assert [event.type for event in too_old] == ["reset"]
+    from_future = await _drain(feed.subscribe(last_seq=99))
+    assert [event.type for event in from_future] == ["reset"]
+    other_worker = await _drain(feed.subscribe(last_seq=3, epoch="0ther"))
+    assert [event.type for event in other_worker] == ["reset"]
+
+@pytest.mark.asyncio
+async def test_since_with_another_workers_epoch_resets():
+    for i in range(3):
+        change_feed.publish("survivor.location", id=i)
+    request = Request({"type": "http", "headers": []})
+
+    first_events = []
+    for since in (f"{change_feed.epoch}-{change_feed.seq - 1}", "deadbeef-1"):
+        response = await endpoint_survivor_changes(request, since=since)
+        body = response.body_iterator
+        await body.__anext__()
+        first_events.append((await body.__anext__()).decode())
+        await body.aclose()
+
+    resumed, other_worker = first_events
+    assert f"id: {change_feed.epoch}-{change_feed.seq}\n" in resumed
+    assert "event: reset\n" in other_worker
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_cut_off_without_blocking():
+    feed = ChangeFeed(queue_size=2)
+    slow = feed.subscribe()
+    fast = feed.subscribe()
+
+    for i in range(3):
+        feed.publish("survivor.location", id=i)
+        await fast.next()
+
+    assert feed.stats()["subscribers"] == 1
+    assert feed.stats()["dropped_subscribers"] == 1
+    chunks = [chunk async for chunk in sse_events(slow, heartbeat=0.01)]
+    assert chunks[0].startswith(b"retry:")
+    assert [chunk.split(b"\n")[0] for chunk in chunks[1:]] == [
+        f"id: {feed.epoch}-{seq}".encode() for seq in (1, 2)
+    ]
+
+@pytest.mark.asyncio
+async def test_services_publish_committed_changes(db: AsyncSession, make_survivor):
+    subscription = change_feed.subscribe()
+    try:
+        first = await make_survivor("Feed One", Inventory(water=1))
+        second = await make_survivor("Feed Two", Inventory(food=1, ammunition=1))
+        await update_location(first.id, Location(latitude=1.0, longitude=2.0), db)
+        await trade_items(
+            Trade(
+                trader1=TradeItem(survivor_id=first.id, items=Inventory(water=1)),
+                trader2=TradeItem(
+                    survivor_id=second.id, items=Inventory(food=1, ammunition=1)
+                ),
+            ),
+            db
+        )
+        await report_infection(first.id, ReportInfection(reporter_id=second.id), db)
+
+        events = await _drain(subscription)
+    finally:
+        subscription.close()
+
+    assert [event.type for event in events] == [
+        "survivor.created",
+        "survivor.created",
+        "survivor.location",
+        "trade",
+        "survivor.reported",
+    ]
+    assert [event.seq for event in events] == sorted(event.seq for event in events)
+    assert events[0].data["survivor"]["name"] == "Feed One"
+    assert events[3].data["inventory_deltas"][first.id] == {
+        "water": -1, "food": 1, "ammunition": 1
+    }
+
+@pytest.mark.asyncio
+async def test_location_batch_publishes_only_matched_survivors(
+    db: AsyncSession, make_survivor
+):
+    survivor = await make_survivor("Feed Batch", Inventory(water=1))
+    subscription = change_feed.subscribe()
+    try:
+        updated = await update_locations(
+            {
+                survivor.id: Location(latitude=3.0, longitude=4.0),
+                survivor.id + 1000: Location(latitude=5.0, longitude=6.0),
+            },
+            db,
+        )
+        events = await _drain(subscription)
+    finally:
+        subscription.close()
+
+    assert updated == 1
+    assert [(event.type, event.data["id"]) for event in events] == [
+        ("survivor.location", survivor.id)
+    ]
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from starlette.requests import Request
+
+from api.database import (
+    LAST_WRITE_COOKIE,
+    READ_YOUR_WRITES_HEADER,
+    READ_YOUR_WRITES_WINDOW,
+    create_engine_from_url,
+    needs_primary,
+)
+
+
+def _request(headers: dict) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+def test_needs_primary_after_recent_write():
+    now = 1000.0
+    recent = _request({"cookie": f"{LAST_WRITE_COOKIE}={now - 1}"})
+    stale = _request(
+        {"cookie": f"{LAST_WRITE_COOKIE}={now - READ_YOUR_WRITES_WINDOW - 1}"}
+    )
+
+    assert needs_primary(recent, now=now)
+    assert not needs_primary(stale, now=now)
+    assert not needs_primary(_request({}), now=now)
+    assert needs_primary(_request({READ_YOUR_WRITES_HEADER: "true"}), now=now)
+
+@pytest.mark.asyncio
+async def test_read_only_engine_rejects_writes(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"
+    primary = create_engine_from_url(url)
+    replica = create_engine_from_url(url, read_only=True)
+    async with primary.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        await conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    async with replica.connect() as conn:
+        assert (await conn.execute(text("SELECT x FROM t"))).scalar() == 1
+        with pytest.raises(OperationalError):
+            await conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    await primary.dispose()
+    await replica.dispose()
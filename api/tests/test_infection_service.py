@@ -2,9 +2,21 @@ import pytest
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import Gender, Inventory, ReportInfection, SurvivorCreate
-from api.service.infection.infection_service import report_infection
-from api.service.survivors.survivor_service import create_survivor
+from api.models import (
+    Gender,
+    InfectionReport,
+    Inventory,
+    ReportInfection,
+    SurvivorCreate,
+)
+from api.service.infection.infection_service import (
+    report_infection,
+    report_infections_batch,
+)
+from api.service.survivors.survivor_service import (
+    create_survivor,
+    get_survivor_by_id,
+)
 
 
 @pytest.mark.asyncio
@@ -104,3 +116,74 @@ async def test_cannot_report_twice(db: AsyncSession):
         )
     assert exc_info.value.status_code == 400
     assert "already reported" in exc_info.value.detail
+
+@pytest.mark.asyncio
+async def test_third_report_marks_infected(db: AsyncSession):
+    survivors = [
+        await create_survivor(
+            SurvivorCreate(
+                name=f"Threshold {i}",
+                age=25,
+                gender=Gender.female,
+                latitude=0.0,
+                longitude=0.0,
+                inventory=Inventory(water=1, food=1, medication=1, ammunition=1)
+            ),
+            db
+        )
+        for i in range(4)
+    ]
+    target, reporters = survivors[0], survivors[1:]
+
+    for reporter in reporters[:2]:
+        await report_infection(target.id, ReportInfection(reporter_id=reporter.id), db)
+    result = await report_infection(
+        target.id, ReportInfection(reporter_id=reporters[2].id), db
+    )
+
+    assert "marked as infected" in result["message"]
+    infected = await get_survivor_by_id(target.id, db)
+    assert infected.infected
+    assert sorted(infected.reporters) == sorted(r.id for r in reporters)
+
+@pytest.mark.asyncio
+async def test_report_infections_batch(db: AsyncSession):
+    survivors = [
+        await create_survivor(
+            SurvivorCreate(
+                name=f"Batch Report {i}",
+                age=25,
+                gender=Gender.male,
+                latitude=0.0,
+                longitude=0.0,
+                inventory=Inventory(water=1, food=1, medication=1, ammunition=1)
+            ),
+            db
+        )
+        for i in range(4)
+    ]
+    target, reporters = survivors[0].id, [s.id for s in survivors[1:]]
+    await report_infection(target, ReportInfection(reporter_id=reporters[0]), db)
+
+    result = await report_infections_batch(
+        [
+            InfectionReport(reporter_id=reporters[0], reported_id=target),
+            InfectionReport(reporter_id=reporters[1], reported_id=target),
+            InfectionReport(reporter_id=reporters[1], reported_id=target),
+            InfectionReport(reporter_id=reporters[2], reported_id=target),
+            InfectionReport(reporter_id=reporters[2], reported_id=reporters[2]),
+        ],
+        db
+    )
+
+    assert [(r.reporter_id, r.reported_id) for r in result.accepted] == [
+        (reporters[1], target),
+        (reporters[2], target),
+    ]
+    assert sorted(r.reason for r in result.rejected) == [
+        "Cannot report self as infected",
+        "You have already reported this survivor",
+        "You have already reported this survivor",
+    ]
+    assert result.newly_infected == [target]
+    assert (await get_survivor_by_id(target, db)).infected
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import inventories
+from api.models import Inventory, Trade, TradeItem
+from api.service.inventory.inventory_service import (
+    apply_inventory_deltas,
+    ensure_inventory_layout,
+    get_inventories,
+    get_survivor_inventory,
+    migrate_to_compact_inventories,
+)
+from api.service.survivors.survivor_service import create_survivor
+from api.service.trading.trading_service import trade_items
+from api.tests.conftest import survivor_form
+
+
+@pytest.mark.asyncio
+async def test_compact_layout_create_and_trade(db: AsyncSession, monkeypatch):
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "compact")
+    trader1 = await create_survivor(survivor_form("Compact One", Inventory(food=2)), db)
+    trader2 = await create_survivor(
+        survivor_form("Compact Two", Inventory(medication=3)), db
+    )
+
+    await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=trader1.id, items=Inventory(food=2)),
+            trader2=TradeItem(survivor_id=trader2.id, items=Inventory(medication=3)),
+        ),
+        db
+    )
+
+    assert await get_survivor_inventory(trader1.id, db) == {
+        "water": 0, "food": 0, "medication": 3, "ammunition": 0
+    }
+    assert (await get_inventories([trader2.id], db))[trader2.id]["food"] == 2
+
+@pytest.mark.asyncio
+async def test_migrate_to_compact_inventories(db: AsyncSession, monkeypatch):
+    rich = await create_survivor(
+        survivor_form("Migrated", Inventory(water=1, food=2, ammunition=5)), db
+    )
+    poor = await create_survivor(survivor_form("Migrated Empty", Inventory()), db)
+    before = await get_inventories([rich.id, poor.id], db)
+
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "compact")
+    assert await migrate_to_compact_inventories(db) == 2
+    await db.commit()
+
+    assert await get_inventories([rich.id, poor.id], db) == before
+
+@pytest.mark.asyncio
+async def test_switching_layouts_back_and_forth_keeps_trades(
+    db: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "compact")
+    await ensure_inventory_layout(db)
+    first = await create_survivor(survivor_form("Switch One", Inventory(water=3)), db)
+    second = await create_survivor(survivor_form("Switch Two", Inventory(food=5)), db)
+
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "items")
+    await ensure_inventory_layout(db)
+    await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=first.id, items=Inventory(water=3)),
+            trader2=TradeItem(survivor_id=second.id, items=Inventory(food=4)),
+        ),
+        db
+    )
+    in_items = await get_inventories([first.id, second.id], db)
+
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "compact")
+    await ensure_inventory_layout(db)
+    assert await get_inventories([first.id, second.id], db) == in_items
+    assert in_items[first.id]["food"] == 4
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("layout", ["items", "compact"])
+async def test_negative_delta_without_a_row_is_rejected(
+    db: AsyncSession, make_survivor, monkeypatch, layout
+):
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", layout)
+    survivor = await make_survivor(f"Rowless {layout}", Inventory(food=2))
+    if layout == "compact":
+        await db.execute(delete(inventories))
+        await db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await apply_inventory_deltas({survivor.id: {"water": -1, "food": 1}}, db)
+    assert exc_info.value.status_code == 409
+    await db.rollback()
+
+    assert (await get_survivor_inventory(survivor.id, db))["water"] == 0
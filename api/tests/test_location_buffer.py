@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import api.main as main
+from api.database import AsyncSessionLocal
+from api.models import Inventory, Location
+from api.service.location.location_buffer import LocationBuffer
+from api.service.survivors.survivor_service import get_survivor_by_id
+
+
+@pytest.mark.asyncio
+async def test_location_buffer_keeps_latest_position(db: AsyncSession, make_survivor):
+    survivor = await make_survivor("Pinger", Inventory(water=1))
+    buffer = LocationBuffer(AsyncSessionLocal, flush_interval=60)
+
+    buffer.put(survivor.id, Location(latitude=1.0, longitude=1.0))
+    buffer.put(survivor.id, Location(latitude=2.0, longitude=2.0))
+    buffer.put(survivor.id + 1000, Location(latitude=3.0, longitude=3.0))
+    await buffer.start()
+    await buffer.stop()
+
+    updated = await get_survivor_by_id(survivor.id, db)
+    assert (updated.latitude, updated.longitude) == (2.0, 2.0)
+    stats = buffer.stats()
+    assert stats["pending"] == 0
+    assert stats["coalesced"] == 1
+    assert stats["flushes"] == 1
+    assert stats["flushed_rows"] == 1
+    assert stats["unmatched_rows"] == 1
+
+@pytest.mark.asyncio
+async def test_shutdown_stops_broadcast_when_final_flush_fails(monkeypatch):
+    stopped = []
+
+    async def failing_stop():
+        raise RuntimeError("flush failed")
+
+    monkeypatch.setattr(main.location_buffer, "stop", failing_stop)
+    monkeypatch.setattr(main.broadcast, "stop", lambda: stopped.append(True))
+    with pytest.raises(RuntimeError):
+        await main.shutdown()
+    assert stopped == [True]
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import Inventory, Location
+from api.service.location.geo import geocell, geocell_ranges, haversine_km
+from api.service.location.location_service import get_nearby_survivors
+from api.service.survivors.survivor_service import update_location
+
+
+def test_geocell_ranges_cover_antimeridian():
+    ranges = geocell_ranges(0.0, 179.99, 20.0)
+    cells = [geocell(0.0, 179.95), geocell(0.0, -179.95), geocell(0.1, -179.9)]
+
+    for cell in cells:
+        assert any(start <= cell <= end for start, end in ranges)
+    assert haversine_km(0.0, 179.99, 0.0, -179.99) < 3
+
+def test_geocell_ranges_reach_the_radius():
+    # Both points are just inside 100 km but in the next row / column of cells.
+    for latitude, longitude, point in (
+        (0.0015, 0.0, (0.9005, 0.0)),
+        (0.0, 0.0015, (0.0, 0.9005)),
+    ):
+        assert haversine_km(latitude, longitude, *point) < 100
+        cell = geocell(*point)
+        ranges = geocell_ranges(latitude, longitude, 100.0)
+        assert any(start <= cell <= end for start, end in ranges)
+
+@pytest.mark.asyncio
+async def test_get_nearby_survivors_nearest_first(db: AsyncSession, make_survivor):
+    far = await make_survivor("Far Away", Inventory(water=1), 10.0, 10.0)
+    near = await make_survivor("Next Door", Inventory(water=1), 52.01, 13.0)
+    nearer = await make_survivor("Same Street", Inventory(water=1), 52.0, 13.001)
+    await make_survivor("Other City", Inventory(water=1), 48.0, 11.0)
+
+    found = await get_nearby_survivors(52.0, 13.0, 5.0, db)
+    assert [s.id for s in found] == [nearer.id, near.id]
+    assert found[0].distance_km < found[1].distance_km
+    assert found[0].inventory.water == 1
+
+    await update_location(far.id, Location(latitude=52.0, longitude=13.0), db)
+    found = await get_nearby_survivors(52.0, 13.0, 5.0, db, limit=1)
+    assert [s.id for s in found] == [far.id]
+    assert found[0].distance_km == 0
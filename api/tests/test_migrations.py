@@ -0,0 +1,69 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import inspect, text
+
+from api.database import Base, create_engine_from_url, run_migrations
+
+
+def _schema_diff(connection):
+    return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+@pytest.mark.asyncio
+async def test_migrations_match_models(tmp_path):
+    engine = create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(run_migrations)
+        diff = await conn.run_sync(_schema_diff)
+    await engine.dispose()
+
+    assert diff == []
+
+@pytest.mark.asyncio
+async def test_migrations_upgrade_legacy_create_all_database(tmp_path):
+    engine = create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE survivors (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL,"
+                " age INTEGER, gender VARCHAR(6), latitude FLOAT, longitude FLOAT,"
+                " infected BOOLEAN)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE infection_reports (reporter_id INTEGER,"
+                " reported_id INTEGER, PRIMARY KEY (reporter_id, reported_id))"
+            )
+        )
+        await conn.execute(
+            text("INSERT INTO survivors VALUES (1, 'A', 30, 'male', 10.0, 20.0, 0)")
+        )
+        await conn.execute(
+            text("INSERT INTO survivors VALUES (3, 'a', 30, 'male', 10.0, 20.0, 0)")
+        )
+        await conn.execute(text("INSERT INTO infection_reports VALUES (2, 1)"))
+
+    async with engine.begin() as conn:
+        await conn.run_sync(run_migrations)
+        columns = await conn.run_sync(
+            lambda sync_conn: {
+                c["name"] for c in inspect(sync_conn).get_columns("survivors")
+            }
+        )
+        row = (
+            await conn.execute(
+                text("SELECT report_count, geocell FROM survivors WHERE id = 1")
+            )
+        ).one()
+        names = (
+            await conn.execute(
+                text("SELECT name, name_lower FROM survivors ORDER BY id")
+            )
+        ).all()
+    await engine.dispose()
+
+    assert {"report_count", "geocell", "name_lower"} <= columns
+    assert row.report_count == 1
+    assert row.geocell is not None
+    assert [tuple(n) for n in names] == [("A", "a"), ("a (3)", "a (3)")]
@@ -0,0 +1,129 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import ItemType
+from api.models import (
+    Inventory,
+    OfferCreate,
+    Trade,
+    TradeItem,
+)
+from api.service.inventory.inventory_service import get_survivor_inventory
+from api.service.offers import offers_service
+from api.service.offers.offers_service import (
+    cancel_offer,
+    create_offer,
+    get_open_offers,
+    order_book,
+)
+from api.service.offers.order_book import OpenOffer, OrderBook, exchange_unit
+from api.service.trading.trading_service import trade_items
+
+
+def _offer(survivor_id: int, give: str, give_qty: int, want: str, want_qty: int):
+    return OfferCreate(
+        survivor_id=survivor_id,
+        give_item=give,
+        give_quantity=give_qty,
+        want_item=want,
+        want_quantity=want_qty,
+    )
+
+def test_order_book_matches_oldest_counter_offer_from_someone_else():
+    book = OrderBook()
+    water, food = ItemType.water, ItemType.food
+    book.add(OpenOffer(1, survivor_id=7, give=food, want=water, units=1))
+    book.add(OpenOffer(2, survivor_id=8, give=food, want=water, units=1))
+    book.add(OpenOffer(3, survivor_id=9, give=food, want=water, units=1))
+    taker = OpenOffer(4, survivor_id=7, give=water, want=food, units=2)
+
+    assert exchange_unit(water, food) == (3, 4)
+    assert book.best_counter(taker).id == 2
+    book.remove(2)
+    assert book.best_counter(taker).id == 3
+    assert book.best_counter(OpenOffer(5, 1, water, food, 1)).id == 1
+    assert book.stats()["books"] == {"food->water": 2}
+
+@pytest.mark.asyncio
+async def test_offers_match_and_settle_as_trades(db: AsyncSession, make_survivor):
+    maker = await make_survivor("Offer Maker", Inventory(food=8))
+    taker = await make_survivor("Offer Taker", Inventory(water=6))
+
+    resting = await create_offer(_offer(maker.id, "food", 8, "water", 6), db)
+    assert resting.fills == []
+    assert resting.offer.status == "open"
+
+    result = await create_offer(_offer(taker.id, "water", 3, "food", 4), db)
+
+    assert result.offer.status == "filled"
+    assert (result.offer.give_quantity, result.offer.want_quantity) == (3, 4)
+    assert result.offer.remaining_give_quantity == 0
+    assert [(f.counterparty_id, f.given, f.received) for f in result.fills] == [
+        (maker.id, 3, 4)
+    ]
+    assert await get_survivor_inventory(taker.id, db) == {
+        "water": 3, "food": 4, "medication": 0, "ammunition": 0
+    }
+    [remaining] = await get_open_offers(db, survivor_id=maker.id)
+    assert (remaining.give_quantity, remaining.want_quantity) == (8, 6)
+    assert (
+        remaining.remaining_give_quantity, remaining.remaining_want_quantity
+    ) == (4, 3)
+
+@pytest.mark.asyncio
+async def test_offer_validation(db: AsyncSession, make_survivor):
+    survivor = await make_survivor("Offer Checks", Inventory(water=1))
+
+    for offer, status in (
+        (_offer(survivor.id, "water", 1, "food", 1), 400),
+        (_offer(survivor.id, "water", 3, "food", 4), 400),
+        (_offer(9999, "water", 1, "ammunition", 4), 404),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            await create_offer(offer, db)
+        assert exc_info.value.status_code == status
+
+@pytest.mark.asyncio
+async def test_unbacked_counter_offer_is_cancelled(db: AsyncSession, make_survivor):
+    maker = await make_survivor("Broke Maker", Inventory(medication=2))
+    taker = await make_survivor("Good Taker", Inventory(ammunition=4))
+    other = await make_survivor("Someone Else", Inventory(ammunition=4))
+
+    stale = await create_offer(_offer(maker.id, "medication", 2, "ammunition", 4), db)
+    await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=maker.id, items=Inventory(medication=2)),
+            trader2=TradeItem(survivor_id=other.id, items=Inventory(ammunition=4)),
+        ),
+        db
+    )
+
+    result = await create_offer(_offer(taker.id, "ammunition", 4, "medication", 2), db)
+
+    assert result.fills == []
+    assert result.offer.status == "open"
+    assert order_book.get(stale.offer.id) is None
+    with pytest.raises(HTTPException) as exc_info:
+        await cancel_offer(stale.offer.id, db)
+    assert exc_info.value.detail == "Offer is already cancelled"
+
+@pytest.mark.asyncio
+async def test_cancel_keeps_offer_in_book_until_commit(
+    db: AsyncSession, make_survivor, monkeypatch
+):
+    maker = await make_survivor("Cancel Maker", Inventory(water=3))
+    posted = await create_offer(_offer(maker.id, "water", 3, "food", 4), db)
+    close = offers_service._close
+
+    async def close_then_fail(*args):
+        await close(*args)
+        raise RuntimeError("transaction failed before commit")
+
+    monkeypatch.setattr(offers_service, "_close", close_then_fail)
+    with pytest.raises(RuntimeError):
+        await cancel_offer(posted.offer.id, db)
+    assert order_book.get(posted.offer.id) is not None
+    assert [o.id for o in await get_open_offers(db, survivor_id=maker.id)] == [
+        posted.offer.id
+    ]
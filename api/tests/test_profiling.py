@@ -0,0 +1,56 @@
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from api.main import app
+from api.models import Inventory
+from api.profiling import Histogram, instrument_engine, start_profile, stop_profile
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, route="/api")
+
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/api",le="0.1"} 2',
+        'latency_seconds_bucket{route="/api",le="1.0"} 3',
+        'latency_seconds_bucket{route="/api",le="+Inf"} 4',
+        'latency_seconds_sum{route="/api"} 3.65',
+        'latency_seconds_count{route="/api"} 4',
+    ]
+
+@pytest.mark.asyncio
+async def test_requests_report_sql_activity(db: AsyncSession, make_survivor):
+    await make_survivor("Profiled", Inventory(water=1))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/survivors")
+        metrics = (await client.get("/metrics")).text
+
+    assert response.status_code == 200
+    assert 'desc="3 queries"' in response.headers["Server-Timing"]
+    assert (
+        'zssn_db_statements_per_request_bucket'
+        '{method="GET",route="/api/survivors",le="3"}'
+    ) in metrics
+    assert "zssn_survivor_cache_hits_total" in metrics
+
+@pytest.mark.asyncio
+async def test_pool_wait_is_measured_after_dispose():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+    await engine.dispose()
+
+    profile, token = start_profile()
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    finally:
+        stop_profile(token)
+        await engine.dispose()
+
+    assert profile.statements == 1
+    assert profile.pool_wait_seconds > 0
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import InfectionReport
+from api.service.graph.report_graph import (
+    ReportGraph,
+    load_report_graph,
+    report_graph,
+)
+from api.service.infection.infection_service import (
+    INFECTION_THRESHOLD,
+    report_infections_batch,
+)
+from api.service.survivors.survivor_service import create_survivors_batch
+from api.tests.conftest import survivor_form
+
+
+def test_report_graph_tracks_risk_clusters_and_reporters():
+    graph = ReportGraph()
+    for reporter_id, reported_id in [(1, 2), (3, 2), (1, 4), (1, 5), (6, 7)]:
+        graph.add_report(reporter_id, reported_id)
+    graph.add_report(1, 2)
+
+    assert [s.id for s in graph.at_risk(3)] == [2]
+    assert [(c.size, c.reports) for c in graph.clusters(2, 10)] == [(5, 4), (2, 1)]
+
+    graph.add_report(4, 2)
+    graph.mark_infected([2])
+
+    assert graph.at_risk(3) == []
+    assert graph.clusters(2, 10)[0].infected == 1
+    [suspect] = graph.suspicious_reporters(3, 0.5, 10)
+    assert (suspect.reporter_id, suspect.reports, suspect.confirmed) == (1, 3, 1)
+
+@pytest.mark.asyncio
+async def test_report_graph_follows_reports_and_reloads(db: AsyncSession):
+    survivors = (
+        await create_survivors_batch(
+            [
+                survivor_form(f"Graph {i}")
+                for i in range(INFECTION_THRESHOLD + 1)
+            ],
+            db,
+        )
+    ).created
+    target, *reporters = [s.id for s in survivors]
+
+    await report_infections_batch(
+        [InfectionReport(reporter_id=r, reported_id=target) for r in reporters[:-1]],
+        db,
+    )
+    assert [s.id for s in report_graph.at_risk(INFECTION_THRESHOLD)] == [target]
+
+    await report_infections_batch(
+        [InfectionReport(reporter_id=reporters[-1], reported_id=target)], db
+    )
+    assert report_graph.at_risk(INFECTION_THRESHOLD) == []
+    live = report_graph.clusters(2, 10)
+
+    await load_report_graph(db)
+    assert report_graph.clusters(2, 10) == live
+    assert live[0].infected == 1
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import (
+    InfectionReport,
+    Inventory,
+    ReportInfection,
+    Trade,
+    TradeItem,
+)
+from api.service.infection.infection_service import (
+    report_infection,
+    report_infections_batch,
+)
+from api.service.reports.reports_service import (
+    compute_population_stats,
+    get_infection_share,
+    get_points_lost,
+    get_population_stats,
+    get_resource_averages,
+    rebuild_population_stats,
+)
+from api.service.survivors.survivor_service import (
+    create_survivor,
+    create_survivors_batch,
+)
+from api.service.trading.trading_service import trade_items
+from api.tests.conftest import survivor_form
+
+
+async def _populate(db: AsyncSession):
+    sick = await create_survivor(survivor_form("Sick", Inventory(water=2, food=1)), db)
+    batch = await create_survivors_batch(
+        [
+            survivor_form("Healthy One", Inventory(water=1, ammunition=4)),
+            survivor_form("Healthy Two", Inventory(food=2)),
+            survivor_form("Healthy Three", Inventory(medication=3)),
+        ],
+        db
+    )
+    one, two, three = batch.created
+
+    await report_infection(sick.id, ReportInfection(reporter_id=one.id), db)
+    await report_infections_batch(
+        [
+            InfectionReport(reporter_id=two.id, reported_id=sick.id),
+            InfectionReport(reporter_id=three.id, reported_id=sick.id),
+        ],
+        db
+    )
+    await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=one.id, items=Inventory(ammunition=3)),
+            trader2=TradeItem(survivor_id=two.id, items=Inventory(food=1)),
+        ),
+        db
+    )
+    return sick
+
+@pytest.mark.asyncio
+async def test_population_stats_track_writes(db: AsyncSession):
+    await _populate(db)
+
+    assert await get_population_stats(db) == await compute_population_stats(db)
+
+    infected = await get_infection_share(db, infected=True)
+    assert (infected.survivors, infected.total, infected.percentage) == (1, 4, 25.0)
+    assert (await get_infection_share(db, infected=False)).percentage == 75.0
+
+    averages = await get_resource_averages(db)
+    assert averages.healthy_survivors == 3
+    assert averages.water == pytest.approx(1 / 3, abs=0.01)
+    assert averages.medication == 1.0
+
+    lost = await get_points_lost(db)
+    assert lost.items == Inventory(water=2, food=1)
+    assert lost.points_lost == 2 * 4 + 3
+
+@pytest.mark.asyncio
+async def test_rebuild_population_stats_matches_compact_layout(
+    db: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr("api.database.INVENTORY_LAYOUT", "compact")
+    await _populate(db)
+    expected = await get_population_stats(db)
+
+    await rebuild_population_stats(db)
+    await db.commit()
+    assert await get_population_stats(db) == expected
+    assert expected[True]["survivors"] == 1
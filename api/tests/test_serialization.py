@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import api.serialization as serialization
+from api.models import Inventory
+from api.service.survivors.survivor_service import (
+    get_survivor_json_by_id,
+    get_survivors_page_json,
+    survivor_columns,
+    survivor_dicts,
+)
+
+INVENTORY = Inventory(water=3, food=0, medication=2, ammunition=9)
+
+
+@pytest.mark.asyncio
+async def test_fast_path_matches_pydantic_output(db: AsyncSession, make_survivor):
+    survivors = [
+        await make_survivor("Zoë", INVENTORY, -12.5, 1e-7),
+        await make_survivor("Ana", INVENTORY, -12.5, 1e-7),
+    ]
+
+    body, next_cursor = await get_survivors_page_json(db, limit=10)
+
+    assert next_cursor is None
+    assert json.loads(body) == [json.loads(s.model_dump_json()) for s in survivors]
+
+    cached = await get_survivor_json_by_id(survivors[0].id, db)
+    assert json.loads(cached) == json.loads(survivors[0].model_dump_json())
+
+@pytest.mark.asyncio
+async def test_stdlib_fallback_matches_orjson(
+    db: AsyncSession, make_survivor, monkeypatch
+):
+    await make_survivor("Zoë", INVENTORY, -12.5, 1e-7)
+    rows = (await db.execute(survivor_columns())).all()
+    dicts = await survivor_dicts(rows, db)
+
+    fast = serialization.dumps_array(dicts)
+    monkeypatch.setattr(serialization, "orjson", None)
+    fallback = serialization.dumps_array(dicts)
+
+    assert json.loads(fallback) == json.loads(fast)
+    assert '"gender":"other"' in fallback.decode()
+    assert "Zoë" in fallback.decode()
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.models import (
+    Inventory,
+    Location,
+    ReportInfection,
+    Trade,
+    TradeItem,
+)
+from api.service.cache.backends import LocalRedis, LRUCache, RedisCache
+from api.service.cache.survivor_cache import survivor_cache
+from api.service.infection.infection_service import report_infection
+from api.service.survivors.survivor_service import (
+    get_survivor_json_by_id,
+    get_survivor_json_by_name,
+    update_location,
+)
+from api.service.trading.trading_service import trade_items
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_expires_and_evicts():
+    cache = LRUCache(max_entries=2)
+    await cache.set("a", b"1", ttl=60)
+    await cache.set("b", b"2", ttl=60)
+    await cache.get("a")
+    await cache.set("c", b"3", ttl=60)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+
+    await cache.set("d", b"4", ttl=0)
+    assert await cache.get("d") is None
+
+@pytest.mark.asyncio
+async def test_redis_cache_round_trip():
+    cache = RedisCache(LocalRedis())
+    await cache.set("key", b"value", ttl=60)
+    assert await cache.get("key") == b"value"
+    await cache.delete("key", "missing")
+    assert await cache.get("key") is None
+
+@pytest.mark.asyncio
+async def test_cached_survivor_invalidated_by_writes(db: AsyncSession, make_survivor):
+    survivor_cache.backend = RedisCache(LocalRedis())
+    first = await make_survivor("Cached One", Inventory(water=1))
+    second = await make_survivor("Cached Two", Inventory(food=1, ammunition=1))
+    third = await make_survivor("Cached Three", Inventory())
+
+    body = await get_survivor_json_by_id(first.id, db)
+    assert await get_survivor_json_by_name("cached one", db) == body
+
+    await update_location(first.id, Location(latitude=10.0, longitude=20.0), db)
+    assert json.loads(await get_survivor_json_by_id(first.id, db))["latitude"] == 10.0
+    await db.commit()
+
+    await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=first.id, items=Inventory(water=1)),
+            trader2=TradeItem(
+                survivor_id=second.id, items=Inventory(food=1, ammunition=1)
+            ),
+        ),
+        db
+    )
+    assert json.loads(await get_survivor_json_by_name("Cached One", db))[
+        "inventory"
+    ]["food"] == 1
+
+    await report_infection(first.id, ReportInfection(reporter_id=third.id), db)
+    assert json.loads(await get_survivor_json_by_id(first.id, db))[
+        "reporters"
+    ] == [third.id]
+
+@pytest.mark.asyncio
+async def test_cache_skips_fills_racing_writes_and_read_your_writes(
+    db: AsyncSession, make_survivor
+):
+    survivor = await make_survivor("Cached Race", Inventory(water=1))
+    token = survivor_cache.fill_token()
+    stale = json.loads(await get_survivor_json_by_id(survivor.id, db, use_cache=False))
+    await update_location(survivor.id, Location(latitude=5.0, longitude=6.0), db)
+
+    await survivor_cache.store(stale, token)
+    assert json.loads(await get_survivor_json_by_id(survivor.id, db))["latitude"] == 5.0
+
+    await survivor_cache.store(stale, survivor_cache.fill_token())
+    body = await get_survivor_json_by_id(survivor.id, db, use_cache=False)
+    assert json.loads(body)["latitude"] == 5.0
@@ -1,12 +1,23 @@
+import json
+
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.database import SurvivorModel
 from api.models import Gender, Inventory, Location, SurvivorCreate
 from api.service.survivors.survivor_service import (
+    Projection,
+    _name_taken,
     create_survivor,
+    create_survivors_batch,
+    export_survivors_ndjson,
     get_survivor_by_id,
     get_survivor_by_name,
+    get_survivors_by_ids,
+    get_survivors_page_json,
     update_location,
 )
 
@@ -50,6 +61,50 @@ async def test_create_duplicate_survivor(db: AsyncSession):
     assert exc_info.value.status_code == 400
     assert "already exists" in exc_info.value.detail
 
+    with pytest.raises(HTTPException) as exc_info:
+        await create_survivor(
+            survivor_data.model_copy(update={"name": "DUPLICATE survivor"}), db
+        )
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_survivor_losing_name_race(db: AsyncSession, monkeypatch):
+    survivor_data = SurvivorCreate(
+        name="Racing Survivor",
+        age=25,
+        gender=Gender.male,
+        latitude=0.0,
+        longitude=0.0,
+        inventory=Inventory(water=1)
+    )
+    await create_survivor(survivor_data, db)
+
+    async def name_looks_free(*args, **kwargs):
+        return False
+
+    # As if the other registration committed right after the name check.
+    monkeypatch.setattr(db, "scalar", name_looks_free)
+    with pytest.raises(HTTPException) as exc_info:
+        await create_survivor(survivor_data, db)
+    assert exc_info.value.status_code == 400
+    assert "already exists" in exc_info.value.detail
+
+@pytest.mark.asyncio
+async def test_only_name_index_violations_count_as_name_taken(db: AsyncSession):
+    errors = []
+    for row in (
+        {"name": "Indexed", "name_lower": "indexed"},
+        {"name": "Indexed", "name_lower": "indexed"},
+        {"name": "INDEXED", "name_lower": "indexed"},
+        {"name": None, "name_lower": "nameless"},
+    ):
+        try:
+            await db.execute(insert(SurvivorModel).values(**row))
+        except IntegrityError as e:
+            errors.append(e)
+
+    assert [_name_taken(e) for e in errors] == [True, True, False]
+
 @pytest.mark.asyncio
 async def test_update_location(db: AsyncSession):
     survivor_data = SurvivorCreate(
@@ -86,3 +141,119 @@ async def test_get_survivor_by_name_case_insensitive(db: AsyncSession):
 
     assert found is not None
     assert found.name == survivor_data.name
+
+@pytest.mark.asyncio
+async def test_get_survivors_page_follows_cursor(db: AsyncSession):
+    for i in range(5):
+        await create_survivor(
+            SurvivorCreate(
+                name=f"Page Test {i}",
+                age=25,
+                gender=Gender.female,
+                latitude=0.0,
+                longitude=0.0,
+                inventory=Inventory(water=i, food=1, medication=1, ammunition=1)
+            ),
+            db
+        )
+
+    pages, cursor = [], None
+    for _ in range(3):
+        body, cursor = await get_survivors_page_json(db, limit=2, cursor=cursor)
+        pages.append(json.loads(body))
+
+    names = [s["name"] for page in pages for s in page]
+    assert names == [f"Page Test {i}" for i in range(5)]
+    assert cursor is None
+    assert [s["inventory"]["water"] for s in pages[0]] == [0, 1]
+
+@pytest.mark.asyncio
+async def test_get_survivors_page_rejects_invalid_cursor(db: AsyncSession):
+    with pytest.raises(HTTPException) as exc_info:
+        await get_survivors_page_json(db, cursor="not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_survivors_ndjson_applies_filters(db: AsyncSession):
+    for i in range(4):
+        await create_survivor(
+            SurvivorCreate(
+                name=f"Export Test {i}",
+                age=25,
+                gender=Gender.other,
+                latitude=float(i * 10),
+                longitude=0.0,
+                inventory=Inventory(water=1, food=1, medication=1, ammunition=1)
+            ),
+            db
+        )
+
+    chunks = [
+        chunk
+        async for chunk in export_survivors_ndjson(
+            db, infected=False, min_latitude=5.0, max_latitude=25.0, batch_size=1
+        )
+    ]
+    records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+    assert [r["name"] for r in records] == ["Export Test 1", "Export Test 2"]
+    assert records[0]["inventory"]["food"] == 1
+
+@pytest.mark.asyncio
+async def test_create_survivors_batch_reports_duplicates(db: AsyncSession):
+    def survivor(name: str) -> SurvivorCreate:
+        return SurvivorCreate(
+            name=name,
+            age=25,
+            gender=Gender.male,
+            latitude=0.0,
+            longitude=0.0,
+            inventory=Inventory(water=2, food=0, medication=1, ammunition=0)
+        )
+
+    await create_survivor(survivor("Camp Existing"), db)
+
+    result = await create_survivors_batch(
+        [
+            survivor("Camp One"),
+            survivor("CAMP EXISTING"),
+            survivor("Camp Two"),
+            survivor("camp one"),
+        ],
+        db
+    )
+
+    assert [s.name for s in result.created] == ["Camp One", "Camp Two"]
+    assert [e.index for e in result.errors] == [1, 3]
+    found = await get_survivor_by_name("camp two", db)
+    assert found.id == result.created[1].id
+    assert found.inventory.water == 2
+
+@pytest.mark.asyncio
+async def test_get_survivors_by_ids_projections(db: AsyncSession):
+    created = [
+        await create_survivor(
+            SurvivorCreate(
+                name=f"Projection {i}",
+                age=30,
+                gender=Gender.male,
+                latitude=0.0,
+                longitude=0.0,
+                inventory=Inventory(water=i, food=1, medication=0, ammunition=0)
+            ),
+            db
+        )
+        for i in range(2)
+    ]
+    ids = [s.id for s in created] + [9999]
+
+    status = await get_survivors_by_ids(ids, db, Projection.status)
+    assert status == {
+        s.id: {"id": s.id, "infected": False, "version": 0} for s in created
+    }
+
+    with_inventory = await get_survivors_by_ids(ids, db, Projection.inventory)
+    assert with_inventory[created[1].id]["inventory"]["water"] == 1
+
+    full = await get_survivors_by_ids(ids, db)
+    assert full == {s.id: s for s in created}
@@ -0,0 +1,150 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database import AsyncSessionLocal
+from api.models import Inventory, Trade, TradeItem
+from api.service.inventory.inventory_service import (
+    get_inventories,
+    get_survivor_inventory,
+)
+from api.service.trading.trading_service import trade_items, trade_items_batch
+
+
+@pytest.mark.asyncio
+async def test_trade_items(db: AsyncSession, make_survivor):
+    trader1 = await make_survivor("Trader One", Inventory(water=2))
+    trader2 = await make_survivor("Trader Two", Inventory(ammunition=8, food=1))
+
+    result = await trade_items(
+        Trade(
+            trader1=TradeItem(survivor_id=trader1.id, items=Inventory(water=1)),
+            trader2=TradeItem(
+                survivor_id=trader2.id, items=Inventory(ammunition=1, food=1)
+            ),
+        ),
+        db
+    )
+
+    assert "completed" in result["message"]
+    assert await get_survivor_inventory(trader1.id, db) == {
+        "water": 1, "food": 1, "medication": 0, "ammunition": 1
+    }
+    assert await get_survivor_inventory(trader2.id, db) == {
+        "water": 1, "food": 0, "medication": 0, "ammunition": 7
+    }
+
+@pytest.mark.asyncio
+async def test_trade_requires_equal_points(db: AsyncSession, make_survivor):
+    trader1 = await make_survivor("Uneven One", Inventory(water=1))
+    trader2 = await make_survivor("Uneven Two", Inventory(ammunition=3))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await trade_items(
+            Trade(
+                trader1=TradeItem(survivor_id=trader1.id, items=Inventory(water=1)),
+                trader2=TradeItem(
+                    survivor_id=trader2.id, items=Inventory(ammunition=3)
+                ),
+            ),
+            db
+        )
+    assert exc_info.value.status_code == 400
+    assert "points" in exc_info.value.detail
+    assert (await get_survivor_inventory(trader1.id, db))["water"] == 1
+
+@pytest.mark.asyncio
+async def test_trade_requires_enough_items(db: AsyncSession, make_survivor):
+    trader1 = await make_survivor("Poor One", Inventory(food=1))
+    trader2 = await make_survivor("Poor Two", Inventory(ammunition=6))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await trade_items(
+            Trade(
+                trader1=TradeItem(survivor_id=trader1.id, items=Inventory(food=2)),
+                trader2=TradeItem(
+                    survivor_id=trader2.id, items=Inventory(ammunition=6)
+                ),
+            ),
+            db
+        )
+    assert exc_info.value.status_code == 400
+    assert "Trader 1" in exc_info.value.detail
+
+@pytest.mark.asyncio
+async def test_trade_items_batch_best_effort(db: AsyncSession, make_survivor):
+    trader1 = await make_survivor("Batch One", Inventory(water=1))
+    trader2 = await make_survivor("Batch Two", Inventory(ammunition=4))
+    swap = Trade(
+        trader1=TradeItem(survivor_id=trader1.id, items=Inventory(water=1)),
+        trader2=TradeItem(survivor_id=trader2.id, items=Inventory(ammunition=4)),
+    )
+
+    result = await trade_items_batch([swap, swap], db, atomic=False)
+
+    assert result.applied
+    assert [r.success for r in result.results] == [True, False]
+    assert (await get_survivor_inventory(trader1.id, db))["ammunition"] == 4
+    assert (await get_survivor_inventory(trader2.id, db))["water"] == 1
+
+@pytest.mark.asyncio
+async def test_trade_items_batch_atomic_rolls_back(db: AsyncSession, make_survivor):
+    trader1 = await make_survivor("Atomic One", Inventory(water=1))
+    trader2 = await make_survivor("Atomic Two", Inventory(ammunition=4))
+    swap = Trade(
+        trader1=TradeItem(survivor_id=trader1.id, items=Inventory(water=1)),
+        trader2=TradeItem(survivor_id=trader2.id, items=Inventory(ammunition=4)),
+    )
+
+    result = await trade_items_batch([swap, swap], db)
+
+    assert not result.applied
+    assert not any(r.success for r in result.results)
+    assert (await get_survivor_inventory(trader1.id, db))["water"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_trades_conserve_items(db: AsyncSession, make_survivor):
+    traders = [
+        await make_survivor(f"Stress {i}", Inventory(water=5, ammunition=20))
+        for i in range(6)
+    ]
+    await db.commit()
+    rng = random.Random(7)
+    trades = []
+    for _ in range(60):
+        first, second = rng.sample(traders, 2)
+        trades.append(
+            Trade(
+                trader1=TradeItem(survivor_id=first.id, items=Inventory(water=1)),
+                trader2=TradeItem(survivor_id=second.id, items=Inventory(ammunition=4)),
+            )
+        )
+
+    async def run(trade: Trade):
+        async with AsyncSessionLocal() as session:
+            try:
+                await trade_items(trade, session)
+                return trade
+            except HTTPException as e:
+                # Out of items, or still conflicting after every retry.
+                assert e.status_code in (400, 409)
+                return None
+
+    settled = [t for t in await asyncio.gather(*map(run, trades)) if t is not None]
+
+    expected = {t.id: Counter(water=5, ammunition=20) for t in traders}
+    for trade in settled:
+        expected[trade.trader1.survivor_id].update(water=-1, ammunition=4)
+        expected[trade.trader2.survivor_id].update(water=1, ammunition=-4)
+    inventories = await get_inventories(expected.keys(), db)
+
+    assert settled
+    for survivor_id, items in expected.items():
+        assert inventories[survivor_id]["water"] == items["water"]
+        assert inventories[survivor_id]["ammunition"] == items["ammunition"]
+    assert sum(i["water"] for i in inventories.values()) == 5 * len(traders)
+    assert sum(i["ammunition"] for i in inventories.values()) == 20 * len(traders)
@@ -1,8 +1,25 @@
 import axios from 'axios';
-import { ISurvivorForm, ITrade } from '../types/types';
+import {
+  ISurvivor,
+  ISurvivorChange,
+  ISurvivorForm,
+  ITrade,
+} from '../types/types';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 
+// Largest page GET /survivors serves.
+const SURVIVOR_PAGE_SIZE = 1000;
+
+const CHANGE_EVENT_TYPES = [
+  'survivor.created',
+  'survivor.location',
+  'survivor.reported',
+  'survivor.infected',
+  'trade',
+  'reset',
+];
+
 export const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -17,9 +34,18 @@ export const api = {
     return data;
   },
 
-  getAllSurvivors: async () => {
-    const { data } = await apiClient.get('/survivors/');
-    return data;
+  // The list is paged; follow X-Next-Cursor until the last page.
+  getAllSurvivors: async (): Promise<ISurvivor[]> => {
+    const survivors: ISurvivor[] = [];
+    let cursor: string | undefined;
+    do {
+      const response = await apiClient.get<ISurvivor[]>('/survivors', {
+        params: { limit: SURVIVOR_PAGE_SIZE, cursor },
+      });
+      survivors.push(...response.data);
+      cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return survivors;
   },
 
   createSurvivor: async (survivor: ISurvivorForm) => {
@@ -56,3 +82,58 @@ export const api = {
     }
   },
 };
+
+// Subscribe to the survivor change feed. EventSource reconnects on its own and
+// resumes from the last event id it received. Returns an unsubscribe function.
+export const subscribeToChanges = (
+  onChange: (change: ISurvivorChange) => void
+): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/survivors/changes`);
+  const listener = (event: MessageEvent) => onChange(JSON.parse(event.data));
+  CHANGE_EVENT_TYPES.forEach((type) => source.addEventListener(type, listener));
+  return () => source.close();
+};
+
+// Apply one change event to a cached survivor list. Returns undefined when the
+// list must be reloaded from scratch.
+export const applySurvivorChange = (
+  survivors: ISurvivor[],
+  change: ISurvivorChange
+): ISurvivor[] | undefined => {
+  switch (change.type) {
+    case 'survivor.created':
+      return survivors.some((s) => s.id === change.survivor.id)
+        ? survivors
+        : [...survivors, change.survivor];
+    case 'survivor.location':
+      return survivors.map((s) =>
+        s.id === change.id
+          ? { ...s, latitude: change.latitude, longitude: change.longitude }
+          : s
+      );
+    case 'survivor.reported':
+      return survivors.map((s) =>
+        s.id === change.id
+          ? { ...s, reporters: [...s.reporters, change.reporter_id] }
+          : s
+      );
+    case 'survivor.infected':
+      return survivors.map((s) =>
+        s.id === change.id ? { ...s, infected: true } : s
+      );
+    case 'trade':
+      return survivors.map((s) => {
+        const deltas = change.inventory_deltas[s.id];
+        if (!deltas) {
+          return s;
+        }
+        const inventory = { ...s.inventory };
+        (Object.keys(deltas) as (keyof typeof inventory)[]).forEach((item) => {
+          inventory[item] += deltas[item] ?? 0;
+        });
+        return { ...s, inventory };
+      });
+    default:
+      return undefined;
+  }
+};
@@ -1,20 +1,52 @@
-import React from 'react';
-import { useQuery } from '@tanstack/react-query';
+import React, { useEffect, useRef } from 'react';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { useUser } from '../contexts/UserContext';
-import { api } from '../api/client';
+import { api, applySurvivorChange, subscribeToChanges } from '../api/client';
 import { ISurvivor } from '../types/types';
 import { SurvivorProfile } from './SurvivorProfile';
 
 export const SurvivorList: React.FC = () => {
   const { user } = useUser();
+  const queryClient = useQueryClient();
   const {
     data: survivors = [],
+    dataUpdatedAt,
     isLoading,
     error,
   } = useQuery({
     queryKey: ['survivors'],
     queryFn: api.getAllSurvivors,
+    staleTime: Infinity,
   });
+  // Set when a change arrives before the first load has finished.
+  const missedChanges = useRef(false);
+
+  // Keep the list current from the change feed instead of refetching it.
+  useEffect(
+    () =>
+      subscribeToChanges((change) => {
+        const current = queryClient.getQueryData<ISurvivor[]>(['survivors']);
+        if (!current) {
+          missedChanges.current = true;
+          return;
+        }
+        const next = applySurvivorChange(current, change);
+        if (next) {
+          queryClient.setQueryData(['survivors'], next);
+        } else {
+          queryClient.invalidateQueries({ queryKey: ['survivors'] });
+        }
+      }),
+    [queryClient]
+  );
+
+  // The pages loaded so far may predate those changes, so load them again.
+  useEffect(() => {
+    if (dataUpdatedAt && missedChanges.current) {
+      missedChanges.current = false;
+      queryClient.invalidateQueries({ queryKey: ['survivors'] });
+    }
+  }, [dataUpdatedAt, queryClient]);
 
   if (isLoading) {
     return (
@@ -60,3 +60,21 @@ export interface ISurvivorForm {
   longitude: number;
   inventory: IInventory;
 }
+
+export type ISurvivorChange =
+  | { seq: number; type: 'survivor.created'; survivor: ISurvivor }
+  | {
+      seq: number;
+      type: 'survivor.location';
+      id: number;
+      latitude: number;
+      longitude: number;
+    }
+  | { seq: number; type: 'survivor.reported'; id: number; reporter_id: number }
+  | { seq: number; type: 'survivor.infected'; id: number }
+  | {
+      seq: number;
+      type: 'trade';
+      inventory_deltas: Record<string, Partial<IInventory>>;
+    }
+  | { seq: number; type: 'reset' };